@@ -0,0 +1,178 @@
+"""
+Benchmarks of the Research Drive API client and the scripts, against a local stand-in of the API (see mock_api.py)
+and synthetic SURF Reporting exports (see generate_reporting.py)
+
+    python benchmarks/bench.py api --projectfolders 5000 --latency 0.05
+    python benchmarks/bench.py report --rows 10000 100000 1000000
+    python benchmarks/bench.py startup
+"""
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), 'src')
+sys.path[:0] = [SRC_DIR, os.path.join(SRC_DIR, 'scripts')]
+
+import researchdrive
+import mock_api
+import generate_reporting
+
+# startup budget in seconds per script: median wall time of "<script> --help" in a fresh interpreter (including
+# the start of the interpreter), i.e. the time before a run starts its actual work. Heavy dependencies (pandas,
+# pyarrow, Qt) are imported where needed, so only the create project folder GUI pays for Qt at startup.
+STARTUP_BUDGET = {'researchdrive_report': 0.15,
+                  'researchdrive_projectfolders': 0.25,
+                  'researchdrive_bulk_create_projectfolders': 0.25,
+                  'researchdrive_create_projectfolder': 0.5}
+
+
+def measure(name, fn, repeat=3):
+    """
+    call function repeatedly and print the minimum and median duration
+    :param name: name of the benchmark
+    :param fn: function without arguments, called with the repeat number
+    :param repeat: number of calls
+    :return: list of durations in seconds
+    """
+    durations = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn(i)
+        durations.append(time.perf_counter() - t0)
+    print('{:<45s} min {:8.3f} s   median {:8.3f} s   ({} runs)'.format(name, min(durations),
+                                                                      statistics.median(durations), repeat))
+    return durations
+
+
+def write_config(config_file, url, columns):
+    with open(config_file, 'w') as f:
+        f.write('[API]\n'
+                'environment_domain = windesheim.data.surfsara.nl\n'
+                'key = benchmark\n'
+                'url = {}\n\n'
+                '[GENERAL]\n'
+                'domains = BE,WF,TN\n'
+                'columns = {}\n\n'
+                '[MAPPING]\n'.format(url, columns))
+
+
+def bench_api(args):
+    server, state, url = mock_api.start_server(n_projectfolders=args.projectfolders, n_accounts=args.accounts,
+                                               latency=args.latency)
+    pages = -(-args.projectfolders // 50)
+    print('Mock API with {} project folders ({} pages) and {} accounts, latency {} s\n'.format(
+        args.projectfolders, pages, args.accounts, args.latency))
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        with researchdrive.ResearchDrive(url=url, token='benchmark') as rd:
+            measure('get_many (serial)', lambda i: rd.get_many(request='functional-account', parallel=False),
+                    repeat=args.repeat)
+            measure('get_many (parallel)', lambda i: rd.get_many(request='functional-account', parallel=True),
+                    repeat=args.repeat)
+            measure('get_projectfolders', lambda i: rd.get_projectfolders(), repeat=args.repeat)
+            measure('create_folder', lambda i: rd.create_folder('benchmark-{}'.format(i)), repeat=args.repeat)
+
+        import researchdrive_projectfolders
+        config_file = os.path.join(work_dir, 'researchdrive_projectfolders.cfg')
+        write_config(config_file, url, 'domain,project_number,name,description,name_convention,owner_name,test,'
+                                       'usage.trans,quotum.trans')
+        argv = sys.argv
+        log_file = os.path.join(work_dir, 'researchdrive_projectfolders.log')
+        sys.argv = ['researchdrive_projectfolders', '-c', config_file, '-o', work_dir, '-l', log_file]
+        try:
+            measure('researchdrive_projectfolders.main', lambda i: researchdrive_projectfolders.main(),
+                    repeat=args.repeat)
+        finally:
+            sys.argv = argv
+            for handler in logging.getLogger().handlers[:]:
+                if getattr(handler, 'baseFilename', None) == log_file:
+                    logging.getLogger().removeHandler(handler)
+                    handler.close()
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print('\nRequests received: {}'.format(', '.join('{} {}: {}'.format(method, endpoint, count)
+                                                      for (method, endpoint), count in sorted(state.requests.items()))))
+
+
+def bench_report(args):
+    import researchdrive_report
+
+    if not os.path.exists(args.data_dir):
+        os.makedirs(args.data_dir)
+
+    for n_rows in args.rows:
+        xlsx_file = os.path.join(args.data_dir, 'SURF Reporting {}.xlsx'.format(n_rows))
+        if not os.path.exists(xlsx_file):
+            t0 = time.perf_counter()
+            generate_reporting.write_export(xlsx_file, generate_reporting.generate_export(n_rows))
+            print('Generated "{}" in {:.1f} s'.format(xlsx_file, time.perf_counter() - t0))
+
+        output_dir = tempfile.mkdtemp()
+        try:
+            measure('create_html_files ({} rows, {} workers)'.format(n_rows, args.workers),
+                    lambda i: researchdrive_report.create_html_files(xlsx_file, output_dir, workers=args.workers),
+                    repeat=args.repeat)
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def bench_startup(args):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC_DIR, os.environ.get('PYTHONPATH', '')]),
+               QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    over_budget = []
+    for script, budget in STARTUP_BUDGET.items():
+        command = [sys.executable, os.path.join(SRC_DIR, 'scripts', script + '.py'), '--help']
+        durations = measure(script,
+                            lambda i: subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True),
+                            repeat=args.repeat)
+        if statistics.median(durations) > budget:
+            over_budget.append(script)
+            print('  over budget of {:.2f} s'.format(budget))
+
+    if over_budget:
+        print('\nStartup over budget: {} (see --profile-startup of the scripts)'.format(', '.join(over_budget)))
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the Research Drive utilities')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show log messages of the benchmarked code')
+    subparsers = parser.add_subparsers(dest='suite', required=True)
+
+    api_parser = subparsers.add_parser('api', help='API client and researchdrive_projectfolders against a mock API')
+    api_parser.add_argument('--projectfolders', default=2000, type=int, help='Number of project folders')
+    api_parser.add_argument('--accounts', default=500, type=int, help='Number of accounts')
+    api_parser.add_argument('--latency', default=0.05, type=float, help='Delay in seconds of each response')
+    api_parser.add_argument('-r', '--repeat', default=3, type=int, help='Number of runs per benchmark')
+    api_parser.set_defaults(fn=bench_api)
+
+    report_parser = subparsers.add_parser('report', help='researchdrive_report on synthetic exports')
+    report_parser.add_argument('--rows', default=[10000, 100000, 1000000], type=int, nargs='+',
+                               help='Number of rows of the exports')
+    report_parser.add_argument('-d', '--data-dir', default=os.path.join(BENCHMARK_DIR, 'data'),
+                               help='Directory to store (and reuse) the generated exports in')
+    report_parser.add_argument('-w', '--workers', default=1, type=int, help='Number of processes writing .html files')
+    report_parser.add_argument('-r', '--repeat', default=1, type=int, help='Number of runs per benchmark')
+    report_parser.set_defaults(fn=bench_report)
+
+    startup_parser = subparsers.add_parser('startup', help='Startup time of the scripts against their budget')
+    startup_parser.add_argument('-r', '--repeat', default=7, type=int, help='Number of runs per script')
+    startup_parser.set_defaults(fn=bench_startup)
+
+    args = parser.parse_args()
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO if args.verbose else logging.WARNING)
+    args.fn(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Generator of synthetic SURF Reporting sharing exports for benchmarks of researchdrive_report
+
+    python benchmarks/generate_reporting.py -n 100000 -f "SURF Reporting 100k.xlsx"
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import numpy
+import pandas
+
+# domains of the recipients, most of them of the own institution
+DOMAINS = ['example.org', 'example.org', 'example.org', 'partner.nl', 'university.edu', 'company.com']
+
+
+def generate_export(n_rows, n_projects=None, seed=0):
+    """
+    generate synthetic sharing export
+    :param n_rows: number of rows
+    :param n_projects: number of projects (defaults to one project per 100 rows)
+    :param seed: seed of the random generator
+    :return: dataframe with the columns of the sharing export, in random order
+    """
+    rng = numpy.random.default_rng(seed)
+    if n_projects is None:
+        n_projects = max(1, n_rows // 100)
+    n_projects = min(n_projects, n_rows)
+
+    # every project has a row for the project folder itself
+    project = numpy.concatenate([numpy.arange(n_projects), rng.integers(0, n_projects, n_rows - n_projects)])
+    depth = numpy.concatenate([numpy.zeros(n_projects, dtype=int), rng.integers(0, 4, n_rows - n_projects)])
+    sub_folders = rng.integers(0, 10, (n_rows, 3)).astype(str)
+    paths = pandas.Series(['/project-{:05d} (Projectfolder)'.format(p) for p in range(n_projects)])[project].values
+    for level in range(3):
+        paths = numpy.where(depth > level, paths + '/folder' + numpy.char.add(str(level), sub_folders[:, level]), paths)
+
+    kind = rng.choice(['individual', 'individual', 'federated_share', 'group'], n_rows)
+    group = 'customgroup_group-' + rng.integers(0, 50, n_rows).astype(str)
+    user = rng.integers(0, 10 * n_projects + 100, n_rows).astype(str)
+    domain = rng.choice(DOMAINS, n_rows)
+    recipient = numpy.char.add(numpy.char.add('user', user), numpy.char.add('@', domain.astype(str)))
+    displayname = numpy.char.add('User ', user)
+
+    df = pandas.DataFrame({'Project': numpy.char.add('P', project.astype(str)),
+                           'shared_path': paths,
+                           'Permissions': rng.choice([1, 17, 19, 31], n_rows),
+                           'Shared as': numpy.where(kind == 'group', group, kind),
+                           'Recipient': recipient,
+                           'Recipient displayname': displayname,
+                           # column not used by researchdrive_report
+                           'Expiration': ''})
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def write_export(file, df):
+    """
+    write sharing export with a title row above the header, like the SURF Reporting export
+    :param file: .xlsx or .csv file
+    :param df: dataframe with sharing export
+    """
+    if os.path.splitext(file)[-1].lower() == '.csv':
+        df.to_csv(file, index=False)
+        return
+    import xlsxwriter
+    # write row by row without keeping the rows in memory, needed for exports with a million rows (pandas writes
+    # column by column, which is not supported in constant memory mode)
+    with xlsxwriter.Workbook(file, {'constant_memory': True}) as workbook:
+        worksheet = workbook.add_worksheet()
+        worksheet.write_row(0, 0, ['SURF Reporting - Sharing'])
+        worksheet.write_row(1, 0, df.columns.tolist())
+        for i, row in enumerate(df.itertuples(index=False, name=None)):
+            worksheet.write_row(i + 2, 0, row)
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Generate synthetic SURF Reporting sharing export')
+    parser.add_argument('-n', '--rows', default=10000, type=int, help='Number of rows')
+    parser.add_argument('-p', '--projects', default=None, type=int, help='Number of projects (default: rows / 100)')
+    parser.add_argument('-f', '--file', default='SURF Reporting.xlsx', help='Resulting .xlsx or .csv file')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    write_export(args.file, generate_export(args.rows, n_projects=args.projects))
+    logging.info('Generated {} rows in "{}" in {:.1f} s'.format(args.rows, args.file, time.perf_counter() - t0))
+
+
+if __name__ == '__main__':
+    main()
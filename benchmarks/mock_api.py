@@ -0,0 +1,161 @@
+"""
+Local stand-in of the SURF Research Drive API for benchmarks
+
+Serves "me", "account", "contract" and "functional-account" (GET, paginated with meta.current_page and
+meta.last_page) and creates project folders on POST "functional-account", with a configurable latency per request.
+
+Run standalone with
+    python benchmarks/mock_api.py --projectfolders 5000 --latency 0.05
+and set "url = http://127.0.0.1:<port>/dashboard/api/" in the [API] section of a script's config file.
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def make_account(i):
+    return {'id': i,
+            'username': 'user{}@example.org'.format(i),
+            'email': 'user{}@example.org'.format(i),
+            'name': 'User {}'.format(i)}
+
+
+def make_projectfolder(i, n_accounts=1):
+    owner = make_account(i % max(1, n_accounts))
+    return {'id': i,
+            'name': '{}_{}_project-{}'.format(100000 + i, ['BE', 'WF', 'TN'][i % 3], i),
+            'description': 'Project folder {}'.format(i),
+            'owner_name': owner['name'],
+            'account': {'id': owner['username']},
+            'contract': {'id': 1},
+            'status': {'value': 'active' if i % 10 else 'inactive'},
+            'usage': {'bytes': 1000 * i, 'trans': '{} kB'.format(i)},
+            'quotum': {'bytes': 10 ** 10, 'trans': '10 GB'}}
+
+
+class MockState:
+    """
+    records served by the mock API and counts of the requests received
+    """
+
+    def __init__(self, n_projectfolders=1000, n_accounts=500, n_contracts=1, latency=0.):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.records = {
+            'account': [make_account(i) for i in range(n_accounts)],
+            'contract': [{'id': i + 1,
+                          'contract_id': 'C-{}'.format(i + 1),
+                          'quotum_option': [{'quotum': 10, 'trans': '10 GB'}, {'quotum': 50, 'trans': '50 GB'}]}
+                         for i in range(n_contracts)],
+            'functional-account': [make_projectfolder(i, n_accounts) for i in range(n_projectfolders)],
+        }
+
+    def count(self, method, endpoint):
+        with self.lock:
+            key = (method, endpoint)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def send_json(self, obj, status=200):
+        body = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def endpoint(self):
+        url = urllib.parse.urlparse(self.path)
+        return url.path.rstrip('/').rsplit('/', 1)[-1], dict(urllib.parse.parse_qsl(url.query))
+
+    def do_GET(self):
+        endpoint, params = self.endpoint()
+        self.state.count('GET', endpoint)
+        time.sleep(self.state.latency)
+
+        if endpoint == 'me':
+            return self.send_json({'data': [self.state.records['account'][0]]})
+        if endpoint not in self.state.records:
+            return self.send_json({'message': 'Not found'}, status=404)
+
+        records = self.state.records[endpoint]
+        per_page = int(params.get('per_page', 50))
+        page = int(params.get('page', 1))
+        last_page = max(1, -(-len(records) // per_page))
+        self.send_json({'data': records[(page - 1) * per_page:page * per_page],
+                        'meta': {'current_page': page,
+                                 'last_page': last_page,
+                                 'per_page': per_page,
+                                 'total': len(records)}})
+
+    def do_POST(self):
+        endpoint, _ = self.endpoint()
+        self.state.count('POST', endpoint)
+        time.sleep(self.state.latency)
+
+        if endpoint != 'functional-account':
+            return self.send_json({'message': 'Not found'}, status=404)
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        with self.state.lock:
+            records = self.state.records['functional-account']
+            record = make_projectfolder(len(records))
+            record.update(name=payload['name'], description=payload.get('description', ''))
+            records.append(record)
+        self.send_json({'data': record})
+
+
+def start_server(n_projectfolders=1000, n_accounts=500, n_contracts=1, latency=0., port=0):
+    """
+    start mock API in a background thread
+    :param n_projectfolders: number of project folders
+    :param n_accounts: number of accounts
+    :param n_contracts: number of contracts
+    :param latency: delay in seconds of each response
+    :param port: port to listen on (0: any free port)
+    :return: tuple with server (stop with server.shutdown()), state and API url
+    """
+    state = MockState(n_projectfolders=n_projectfolders, n_accounts=n_accounts, n_contracts=n_contracts,
+                      latency=latency)
+    handler = type('Handler', (MockHandler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/dashboard/api/'.format(server.server_port)
+    return server, state, url
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Local stand-in of the SURF Research Drive API')
+    parser.add_argument('-p', '--port', default=8000, type=int, help='Port to listen on')
+    parser.add_argument('--projectfolders', default=1000, type=int, help='Number of project folders')
+    parser.add_argument('--accounts', default=500, type=int, help='Number of accounts')
+    parser.add_argument('--contracts', default=1, type=int, help='Number of contracts')
+    parser.add_argument('--latency', default=0.05, type=float, help='Delay in seconds of each response')
+    args = parser.parse_args()
+
+    server, state, url = start_server(n_projectfolders=args.projectfolders, n_accounts=args.accounts,
+                                      n_contracts=args.contracts, latency=args.latency, port=args.port)
+    logging.info('Mock Research Drive API at {} (stop with Ctrl+C)'.format(url))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
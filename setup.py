@@ -18,12 +18,19 @@ setup(
         "": "src",
     },
     install_requires=requirements,  # Dependencies from requirements.txt
+    extras_require={
+        "snapshot": ["pyarrow>=14.0.0"],  # On-disk Parquet snapshots of listings
+        "async": ["httpx>=0.24.0"],  # AsyncResearchDrive client
+        "calamine": ["python-calamine>=0.2.0"],  # Fast .xlsx reader for researchdrive_report (pandas>=2.2)
+        "columnar": ["pyarrow>=14.0.0"],  # Columnar (.feather) intermediate of the export for researchdrive_report
+    },
     python_requires=">=3.8",
     entry_points={
         "console_scripts": [
             "researchdrive_projectfolders=scripts.researchdrive_projectfolders:main",
             "researchdrive_report=scripts.researchdrive_report:main",
             "researchdrive_create_projectfolder=scripts.researchdrive_create_projectfolder:main",
+            "researchdrive_bulk_create_projectfolders=scripts.researchdrive_bulk_create_projectfolders:main",
         ]
     },
     classifiers=[
@@ -1,7 +1,413 @@
 import logging
+import os
+import datetime
 import requests
+from requests.adapters import HTTPAdapter
 import json
-import pandas
+import hashlib
+import threading
+import time
+import random
+import itertools
+import math
+import numbers
+import email.utils
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+
+
+def flatten_record(record, sep='.'):
+    """
+    flatten nested json record in the same way as pandas.json_normalize
+    :param record: dictionary, possibly with nested dictionaries
+    :param sep: separator of nested keys
+    :return: flat dictionary with keys like "status.value"
+    """
+    flat = {key: value for key, value in record.items() if not isinstance(value, dict)}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            for nested_key, nested_value in flatten_record(value, sep=sep).items():
+                flat['{}{}{}'.format(key, sep, nested_key)] = nested_value
+    return flat
+
+
+def tuple_getter(keys):
+    """
+    get items of a record as tuple, also for a single or no key (unlike operator.itemgetter)
+    :param keys: list of keys (or indices)
+    :return: function of a record, returning a tuple with the values of the keys
+    """
+    if len(keys) == 0:
+        return lambda record: ()
+    if len(keys) == 1:
+        getter = itemgetter(keys[0])
+        return lambda record: (getter(record),)
+    return itemgetter(*keys)
+
+
+class RecordSchema:
+    """
+    Flattener of json records of a known shape, e.g. the accounts, contracts or project folders of the API.
+
+    The flattened columns (in the order of pandas.json_normalize) and the accessors of the values are derived once
+    from an example record. Records of the same shape are then flattened with item lookups in C, without walking
+    the nested dictionaries and formatting the dotted keys of every record. Records of another shape (fields added
+    or missing, or an object where the example has a value) are not flattened, so they can be flattened with
+    flatten_record instead.
+
+    Attributes:
+        columns (list): Flattened columns, e.g. ["id", "name", "status.value"].
+        n_keys (int): Number of keys of a record of this shape.
+        leaves (callable): Function of a record, returning the values that are not nested objects as tuple.
+        nested (list): Tuples with key and RecordSchema of the nested objects.
+    """
+
+    def __init__(self, record, sep='.'):
+        """
+        initialise RecordSchema class
+        :param record: example json record
+        :param sep: separator of nested keys
+        """
+        self.columns = list(flatten_record(record, sep=sep))
+        self.n_keys = len(record)
+        self.leaves = tuple_getter([key for key, value in record.items() if not isinstance(value, dict)])
+        self.nested = [(key, RecordSchema(value, sep=sep)) for key, value in record.items()
+                       if isinstance(value, dict)]
+        if len(self.values(record)) != len(self.columns):
+            # a key like "status.value" next to a nested "status" collides when flattened; never match records
+            self.n_keys = None
+
+    def values(self, record):
+        """
+        get values of a record, assuming the shape of the schema
+        :param record: json record
+        :return: tuple with the values of self.columns (None if the number of keys differs)
+        """
+        if len(record) != self.n_keys:
+            return None
+        values = self.leaves(record)
+        for key, schema in self.nested:
+            nested_values = schema.values(record[key])
+            if nested_values is None:
+                return None
+            values += nested_values
+        return values
+
+    def flatten(self, record):
+        """
+        flatten record of the shape of the schema
+        :param record: json record
+        :return: tuple with the values of self.columns (None if the record has another shape)
+        """
+        try:
+            values = self.values(record)
+        except (KeyError, TypeError):
+            return None
+        if values is None or dict in map(type, values):
+            return None
+        return values
+
+
+class FrameBuilder:
+    """
+    Builder of a dataframe from records of the SURF Research Drive API.
+
+    Records are flattened like pandas.json_normalize and written straight into column buffers that are allocated
+    for the expected number of records, so the raw json of earlier pages does not need to be kept in memory.
+    Records can be filtered and columns projected while building, so skipped records and columns are never stored.
+    Records of the shape of the schema (by default learnt from the first record) are flattened with precomputed
+    accessors; records of another shape are flattened generically.
+
+    Attributes:
+        size (int): Expected number of records, e.g. meta.total of the first page (buffers grow if exceeded).
+        length (int): Number of records appended so far.
+        projection (list): Columns to keep, in order (None to keep all fields).
+        fields (dict): Flattened fields of all records seen (including skipped records and columns) as keys, in order.
+        predicate (callable): Function of a flattened record; records for which it returns False are skipped.
+        schema (RecordSchema): Schema of the records (relearnt if most records have another shape).
+        missing (float): Value of missing fields (numpy.nan, like in pandas.json_normalize).
+    """
+    size = 0
+    length = 0
+    projection = None
+    predicate = None
+    schema = None
+    missing = None
+
+    def __init__(self, size=None, columns=None, predicate=None, schema=None):
+        """
+        initialise FrameBuilder class
+        :param size: expected number of records
+        :param columns: list of (flattened) columns to keep, e.g. ["name", "status.value"] (default: all fields)
+        :param predicate: function of a flattened record, returning False for records to skip (optional)
+        :param schema: RecordSchema of the records (default: learnt from the first record)
+        """
+        import numpy
+        self.missing = numpy.nan
+        self.size = size or 0
+        self.length = 0
+        self.columns = {}
+        self.predicate = predicate
+        self.schema = schema
+        # buffers of the schema columns (bound on the first record flattened with the schema) and counts of the
+        # records flattened with and without the schema
+        self.buffers = None
+        self.select = None
+        self.hits = 0
+        self.misses = 0
+        # fields of the records seen and the schema whose columns are included in them
+        self.fields = {}
+        self.fields_schema = None
+        if columns is not None:
+            self.projection = list(columns)
+            # projected columns are allocated upfront, columns of fields no record has are left out in to_frame
+            for column in self.projection:
+                self.columns[column] = [self.missing] * self.size
+
+    def bind(self):
+        """
+        collect the column buffers of the schema columns to keep, adding missing columns in the schema order
+        """
+        keep = range(len(self.schema.columns))
+        if self.projection is not None:
+            keep = [i for i, column in enumerate(self.schema.columns) if column in self.columns]
+            self.select = tuple_getter(keep) if len(keep) < len(self.schema.columns) else None
+        for i in keep:
+            column = self.schema.columns[i]
+            if column not in self.columns:
+                # missing values are NaN, like in pandas.json_normalize
+                self.columns[column] = [self.missing] * self.size
+        self.buffers = [self.columns[self.schema.columns[i]] for i in keep]
+
+    def grow(self):
+        """
+        grow all buffers if full
+        """
+        if self.length == self.size:
+            extra = max(self.size, 50)
+            for column in self.columns.values():
+                column.extend([self.missing] * extra)
+            self.size += extra
+
+    def append(self, record):
+        """
+        add record to the column buffers
+        :param record: json record
+        """
+        if self.schema is None:
+            self.schema = RecordSchema(record)
+        values = self.schema.flatten(record)
+        if values is None:
+            self.misses += 1
+            if self.misses > self.hits:
+                # the schema does not fit most records, learn it from this record
+                self.schema = RecordSchema(record)
+                self.buffers = None
+            self.append_flat(flatten_record(record))
+            return
+
+        self.hits += 1
+        if self.fields_schema is not self.schema:
+            self.fields.update(dict.fromkeys(self.schema.columns))
+            self.fields_schema = self.schema
+        if self.predicate is not None and not self.predicate(dict(zip(self.schema.columns, values))):
+            return
+        if self.buffers is None:
+            self.bind()
+        if self.select is not None:
+            values = self.select(values)
+        self.grow()
+        i = self.length
+        for buffer, value in zip(self.buffers, values):
+            buffer[i] = value
+        self.length += 1
+
+    def append_flat(self, flat):
+        """
+        add flattened record of any shape to the column buffers
+        :param flat: flat dictionary, see flatten_record
+        """
+        self.fields.update(dict.fromkeys(flat))
+        if self.predicate is not None and not self.predicate(flat):
+            return
+        if self.projection is not None:
+            flat = {key: flat[key] for key in self.projection if key in flat}
+
+        self.grow()
+        for key, value in flat.items():
+            if key not in self.columns:
+                # missing values are NaN, like in pandas.json_normalize
+                self.columns[key] = [self.missing] * self.size
+            self.columns[key][self.length] = value
+        self.length += 1
+
+    def extend(self, records):
+        """
+        add records to the column buffers
+        :param records: list of json records
+        """
+        for record in records:
+            self.append(record)
+
+    def to_frame(self):
+        """
+        build dataframe from the column buffers
+        :return: dataframe
+        """
+        import pandas
+        for column in self.columns.values():
+            del column[self.length:]
+        self.size = self.length
+        # like selecting rows and columns of the full listing: the columns are the (projected) fields of all records
+        # seen in order of appearance, also if no record is kept, and fields that no record has are left out
+        columns = self.fields if self.projection is None else [column for column in self.projection
+                                                                 if column in self.fields]
+        return pandas.DataFrame({column: self.columns[column] if column in self.columns
+                                 else [self.missing] * self.length for column in columns},
+                                index=pandas.RangeIndex(self.length))
+
+
+class ResponseCache:
+    """
+    In-memory cache for responses of the SURF Research Drive API.
+
+    Responses are keyed by endpoint and params, expire after a time-to-live that can be set per endpoint and
+    the least recently used entries are evicted once the maximum number of entries is reached.
+
+    Attributes:
+        maxsize (int): Maximum number of cached responses.
+        ttl (float): Default time-to-live of cached responses in seconds.
+        endpoint_ttl (dict): Time-to-live in seconds per endpoint, e.g. {'functional-account': 60}.
+    """
+    maxsize = 256
+    ttl = 300
+    endpoint_ttl = {}
+
+    def __init__(self, maxsize=None, ttl=None, endpoint_ttl=None):
+        """
+        initialise ResponseCache class
+        :param maxsize: maximum number of cached responses (defaults to self.maxsize)
+        :param ttl: default time-to-live in seconds (defaults to self.ttl)
+        :param endpoint_ttl: dictionary with time-to-live in seconds per endpoint
+        """
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if ttl is not None:
+            self.ttl = ttl
+        self.endpoint_ttl = dict(self.endpoint_ttl, **(endpoint_ttl or {}))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint(request):
+        """
+        derive endpoint from request string (e.g. "functional-account/12" -> "functional-account")
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :return: endpoint string
+        """
+        return request.split('?')[0].strip('/').split('/')[0]
+
+    def key(self, request, params=None):
+        """
+        derive cache key from request string and params
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param params: dictionary with params
+        :return: hashable key
+        """
+        return request, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+
+    def get(self, request, params=None):
+        """
+        get cached response
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param params: dictionary with params
+        :return: cached json object (None if not cached or expired)
+        """
+        key = self.key(request, params)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            expires, data = self._entries[key]
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, request, params, data):
+        """
+        store response in cache
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param params: dictionary with params
+        :param data: json object
+        """
+        key = self.key(request, params)
+        ttl = self.endpoint_ttl.get(self.endpoint(request), self.ttl)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, request=None):
+        """
+        remove cached responses
+        :param request: request string of which the endpoint is invalidated (None to invalidate all)
+        """
+        with self._lock:
+            if request is None:
+                self._entries.clear()
+                return
+            endpoint = self.endpoint(request)
+            for key in [key for key in self._entries if self.endpoint(key[0]) == endpoint]:
+                del self._entries[key]
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter, shared by all threads that use the same ResearchDrive instance.
+
+    Attributes:
+        rate (float): Number of requests per second.
+        capacity (float): Maximum number of requests in a burst.
+    """
+    rate = 10
+    capacity = 10
+
+    def __init__(self, rate=None, capacity=None):
+        """
+        initialise RateLimiter class
+        :param rate: number of requests per second (defaults to self.rate)
+        :param capacity: maximum number of requests in a burst (defaults to rate)
+        """
+        if rate is not None:
+            self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, self.rate)
+        self._tokens = self.capacity
+        self._timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        reserve a token from the bucket
+        :return: delay in seconds until the reserved token is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._timestamp) * self.rate)
+            self._timestamp = now
+            # reserve the token, so waiting threads are served in order
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0
+
+    def acquire(self):
+        """
+        take a token from the bucket, waiting until it is available
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
 
 
 class ResearchDrive:
@@ -15,22 +421,173 @@ class ResearchDrive:
         url (str): The base URL of the Research Drive API. https://<institute>.data.surfsara.nl/dashboard/api/
         headers (dict): Headers for API requests, including the authorization token.
         dry_run (bool): If True, POST methods will return payload in logging instead of making API calls.
+        max_workers (int): Maximum number of pages that are fetched concurrently by get_many in parallel mode.
+        pool_size (int): Maximum number of keep-alive connections kept open in the connection pool.
+        session (requests.Session): Persistent HTTP session shared by all API calls.
+        cache (ResponseCache): Optional in-memory cache for GET responses (None if caching is disabled).
+        snapshot_dir (str): Directory with on-disk Parquet snapshots of account and project folder listings.
+        snapshot_max_age (float): Maximum age in minutes of a snapshot to be used instead of calling the API.
+        offline (bool): If True, listings are read from the snapshots regardless of their age.
+        sync_key (str): Field identifying a record in the incremental synchronisation of project folders.
+        index_columns (dict): Columns per listing on which hash indexes are built for owner, contract and name lookups.
+        timeout (float): Timeout in seconds of a single HTTP request.
+        retries (int): Maximum number of retries of a failed request.
+        backoff_factor (float): Base delay in seconds of the exponential backoff between retries.
+        backoff_max (float): Maximum delay in seconds between retries (unless the API asks for more in Retry-After).
+        retry_statuses (tuple): HTTP status codes of GET requests that are retried.
+        post_retry_statuses (tuple): HTTP status codes of POST requests that are retried (request not processed).
+        rate_limiter (RateLimiter): Optional client-side rate limiter (None if disabled).
+        filter_fields (dict): Field of a project folder record per filter of get_projectfolders.
+        server_filters (dict): Query param per filter of get_projectfolders that the API applies server-side;
+            other filters are applied while the records are streamed into the dataframe.
     """
     url = None
     headers = {}
     dry_run = False
+    max_workers = 8
+    pool_size = 10
+    session = None
+    cache = None
+    snapshot_dir = None
+    snapshot_max_age = None
+    offline = False
+    sync_key = 'id'
+    index_columns = {'account': ('username', 'email', 'name'),
+                     'contract': ('id', 'contract_id'),
+                     'functional-account': ('name',)}
+    timeout = 60
+    retries = 5
+    backoff_factor = 0.5
+    backoff_max = 60
+    retry_statuses = (429, 500, 502, 503, 504)
+    post_retry_statuses = (429,)
+    rate_limiter = None
+    filter_fields = {'status': 'status.value',
+                     'owner': 'owner_name',
+                     'contract': 'contract.id'}
+    server_filters = {}
 
-    def __init__(self, url=None, token=None):
+    def __init__(self, url=None, token=None, pool_size=None, cache=None, snapshot_dir=None, snapshot_max_age=None,
+                 offline=False, rate_limit=None):
         """
         initialise ResearchDrive class
         :param url: API url https://<environment_domain>/dashboard/api/
         :param token: API access token
+        :param pool_size: maximum number of connections in the connection pool (defaults to self.pool_size)
+        :param cache: True or ResponseCache instance to cache GET responses in memory (disabled by default)
+        :param snapshot_dir: directory to store on-disk snapshots of listings in (disabled by default)
+        :param snapshot_max_age: maximum age in minutes of a snapshot to be used instead of calling the API
+        :param offline: if True, read listings from the snapshots regardless of their age
+        :param rate_limit: maximum number of requests per second, shared by all threads (unlimited by default)
         """
         self.url = url
         self.headers = {'Authorization': 'Bearer {}'.format(token),
                         'Accept-Language': 'en',
                         'Content-Type': 'application/json',
                         'accept': 'application/json'}
+        if pool_size is not None:
+            self.pool_size = pool_size
+
+        self.session = self.create_session()
+
+        if cache is True:
+            cache = ResponseCache()
+        if cache:
+            self.cache = cache
+
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_max_age = snapshot_max_age
+        self.offline = offline
+        self._sync_stores = {}
+        self._indexes = {}
+        # record schema per request, learnt from the first listing and reused by subsequent listings
+        self._record_schemas = {}
+
+        if rate_limit:
+            self.rate_limiter = RateLimiter(rate=rate_limit)
+
+    def create_session(self):
+        """
+        create HTTP session with a pool of keep-alive connections; headers are stored once in the session
+        :return: requests.Session
+        """
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.headers['Connection'] = 'keep-alive'
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        close the HTTP session and the connections in its pool
+        """
+        self.session.close()
+
+    def retry_delay(self, attempt, response=None):
+        """
+        get delay before the next retry, respecting the Retry-After header of the response if available
+        :param attempt: number of the failed attempt (starting at 0)
+        :param response: response of the failed attempt (None if no response was received)
+        :return: delay in seconds
+        """
+        retry_after = None if response is None else response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    retry_at = email.utils.parsedate_to_datetime(retry_after)
+                    return max(0.0, retry_at.timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** attempt))
+
+    def send(self, method, url, retry_statuses=None, **kwargs):
+        """
+        send HTTP request over the session, with rate limiting and retries with exponential backoff
+        :param method: HTTP method ("GET" or "POST")
+        :param url: full url
+        :param retry_statuses: HTTP status codes to retry (defaults to self.retry_statuses)
+        :param kwargs: keyword arguments passed to requests.Session.request
+        :return: response (None if no response was received)
+        """
+        if retry_statuses is None:
+            retry_statuses = self.retry_statuses
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                r = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                reason = 'status code {}'.format(r.status_code)
+            except requests.RequestException as e:
+                r = None
+                reason = e.__class__.__name__
+
+            if r is not None and r.status_code not in retry_statuses:
+                return r
+            if r is None and method != 'GET':
+                # the request might have been processed; only GET requests are safe to resend
+                return r
+            if attempt >= self.retries:
+                return r
+
+            delay = self.retry_delay(attempt, r)
+            logging.warning('{} request to {} failed with {}; retry {} of {} in {:.1f} s'.format(method, url, reason,
+                                                                                              attempt + 1,
+                                                                                              self.retries,
+                                                                                              delay))
+            time.sleep(delay)
+            attempt += 1
 
     def get(self, request='me', params=None):
         """
@@ -43,48 +600,139 @@ class ResearchDrive:
             params = {}
         url = self.url + request
 
-        try:
-            r = requests.get(url,
-                             headers=self.headers,
-                             params=params,
-                             )
-        except:
+        if self.cache is not None:
+            data = self.cache.get(request, params)
+            if data is not None:
+                logging.debug('GET request to {} served from cache'.format(url))
+                return data
+
+        r = self.send('GET', url, params=params)
+        if r is None:
             logging.error('GET request to {} does not give valid response'.format(url))
             return None
 
         if r.status_code == 200:
             json_text = r.text
             data = json.loads(json_text)
+            if self.cache is not None:
+                self.cache.set(request, params, data)
             return data
         else:
             logging.error('GET request to {} gives status code {}\n{}'.format(url, r.status_code, r.text))
             return None
 
-    def get_many(self, request='account', per_page=50, params=None):
+    def iter_pages(self, request='account', per_page=50, params=None, parallel=False, max_workers=None):
         """
-        series of get calls to Research Drive API
+        generator of pages of a paginated Research Drive API request, yielded as they arrive
         :param request: request string (excluding https://<environment_domain>/dashboard/api/)
         :param per_page: number of records per page
         :param params: dictionary with params to parse
-        :return: json object (if http status code == 200, None otherwise)
+        :param parallel: if True, fetch the first page and subsequently the remaining pages concurrently
+        :param max_workers: maximum number of concurrent requests in parallel mode (defaults to self.max_workers)
+        :return: generator of json objects, one per page in page order (stops at the first page that fails)
         """
         if params is None:
             params = {}
-        params['per_page'] = per_page
-        data = []
-        current_page = 0
-        last_page = 1
+        params = dict(params, per_page=per_page)
+
+        # get first page and read meta information
+        data = self.get(request=request, params=dict(params, page=1))
+        if data is None:
+            return
+        yield data
+        current_page = data['meta']['current_page']
+        last_page = data['meta']['last_page']
+
+        if parallel and last_page > current_page:
+            if max_workers is None:
+                max_workers = self.max_workers
+            pages = iter(range(current_page + 1, last_page + 1))
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                # keep at most max_workers pages in flight, so only a few pages are held in memory
+                futures = deque(executor.submit(self.get, request, dict(params, page=page))
+                                for page in itertools.islice(pages, max_workers))
+                while futures:
+                    data = futures.popleft().result()
+                    if data is None:
+                        for future in futures:
+                            future.cancel()
+                        return
+                    page = next(pages, None)
+                    if page is not None:
+                        futures.append(executor.submit(self.get, request, dict(params, page=page)))
+                    yield data
+            return
 
         while last_page > current_page:
-            params['page'] = current_page + 1
             # get next page
-            data.append(self.get(request=request, params=params))
+            data = self.get(request=request, params=dict(params, page=current_page + 1))
+            if data is None:
+                return
+            yield data
             # read meta information
-            current_page = data[-1]['meta']['current_page']
-            last_page = data[-1]['meta']['last_page']
+            current_page = data['meta']['current_page']
+            last_page = data['meta']['last_page']
+
+    def iter_records(self, request='account', per_page=50, params=None, parallel=False, max_workers=None):
+        """
+        generator of records of a paginated Research Drive API request, yielded as the pages arrive
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param per_page: number of records per page
+        :param params: dictionary with params to parse
+        :param parallel: if True, fetch the first page and subsequently the remaining pages concurrently
+        :param max_workers: maximum number of concurrent requests in parallel mode (defaults to self.max_workers)
+        :return: generator of json records
+        """
+        for data in self.iter_pages(request=request, per_page=per_page, params=params, parallel=parallel,
+                                    max_workers=max_workers):
+            yield from data['data']
+
+    def get_many(self, request='account', per_page=50, params=None, parallel=False, max_workers=None):
+        """
+        series of get calls to Research Drive API
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param per_page: number of records per page
+        :param params: dictionary with params to parse
+        :param parallel: if True, fetch the first page and subsequently all remaining pages concurrently
+        :param max_workers: maximum number of concurrent requests in parallel mode (defaults to self.max_workers)
+        :return: list of json objects, one per page in page order (None if any of the pages fails)
+        """
+        data = list(self.iter_pages(request=request, per_page=per_page, params=params, parallel=parallel,
+                                    max_workers=max_workers))
+        if len(data) == 0 or data[-1]['meta']['current_page'] < data[-1]['meta']['last_page']:
+            logging.error('Not all pages of GET request to {} could be retrieved'.format(request))
+            return None
 
         return data
 
+    def get_frame(self, request='account', per_page=50, params=None, parallel=True, columns=None, predicate=None):
+        """
+        get all records of a paginated Research Drive API request as dataframe, built while the pages arrive
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param per_page: number of records per page
+        :param params: dictionary with params to parse
+        :param parallel: if True, fetch the first page and subsequently the remaining pages concurrently
+        :param columns: list of (flattened) columns to keep (default: all fields)
+        :param predicate: function of a flattened record, returning False for records to skip (optional)
+        :return: dataframe with one row per record (None if any of the pages fails)
+        """
+        builder = None
+        meta = None
+        for data in self.iter_pages(request=request, per_page=per_page, params=params, parallel=parallel):
+            meta = data['meta']
+            if builder is None:
+                builder = FrameBuilder(size=meta.get('total'), columns=columns, predicate=predicate,
+                                       schema=self._record_schemas.get(request))
+            builder.extend(data['data'])
+
+        if meta is None or meta['current_page'] < meta['last_page']:
+            logging.error('Not all pages of GET request to {} could be retrieved'.format(request))
+            return None
+
+        if builder.schema is not None:
+            self._record_schemas[request] = builder.schema
+        return builder.to_frame()
+
     def post(self, request='', payload=None):
         """
         post call to Research Drive API
@@ -100,18 +748,17 @@ class ResearchDrive:
             logging.info('Dry run, returning payload of POST request')
             return payload
 
-        try:
-            r = requests.post(url,
-                             headers=self.headers,
-                             data=json.dumps(payload),
-                             )
-        except:
+        r = self.send('POST', url, retry_statuses=self.post_retry_statuses, data=json.dumps(payload))
+        if r is None:
             logging.error('POST request to {} does not give valid response'.format(url))
             return None
 
         if r.status_code == 200:
             json_text = r.text
             data = json.loads(json_text)
+            if self.cache is not None:
+                # cached listings of this endpoint are outdated after a successful POST
+                self.cache.invalidate(request)
             return data
         else:
             logging.error('POST request to {} gives status code {}\n{}'.format(url, r.status_code, r.text))
@@ -127,54 +774,304 @@ class ResearchDrive:
         :param quotum: storage quotum in GB (integer)
         :return:
         """
+        quotum_gb = self.parse_quotum(quotum)
+        if quotum_gb is None:
+            logging.error('Quotum "{}" is not a positive whole number of GB'.format(quotum))
+            return {}
+
         if owner is None:
             me_df = self.get_me()
+            if me_df is None:
+                logging.error('Could not retrieve current user')
+                return {}
             owner_username = me_df.username.values[0]
         else:
             accounts_df = self.get_accounts()
-            if type(owner) == type({}):
-                idx = (accounts_df[list(owner)] == pandas.Series(owner)).all(axis=1)
+            if accounts_df is None:
+                logging.error('Could not retrieve accounts')
+                return {}
+            owner_username = self.resolve_owner(owner, accounts_df)
+            if owner_username is None:
+                return {}
+
+        contracts_df = self.get_contracts()
+        if contracts_df is None:
+            logging.error('Could not retrieve contracts')
+            return {}
+        contract_id = self.resolve_contract(contract, contracts_df)
+        if contract_id is None:
+            return {}
+
+        projectfolders_df = self.get_projectfolders()
+        if projectfolders_df is None:
+            logging.error('Could not retrieve project folders')
+            return {}
+        if name in self.get_index('functional-account', projectfolders_df, 'name'):
+            logging.error('Project folder with name "{}" already exists'.format(name))
+            return {}
+
+        payload = self.folder_payload(name, description=description, owner_username=owner_username,
+                                      contract_id=contract_id, quotum=quotum_gb)
+
+        data = self.post(request='functional-account', payload=payload)
+
+        return data
+
+    def create_folders(self, manifest, max_workers=None):
+        """
+        create series of Research Drive project folders
+
+        Accounts, contracts and project folders are fetched once, owners and contracts are resolved and names
+        are checked for duplicates locally, after which the project folders are created concurrently.
+        :param manifest: dataframe (or list of dictionaries) with columns "name" and optionally "description",
+            "owner" (username; defaults to "me"), "contract" (contract_id or id) and "quotum" (GB; defaults to 10)
+        :param max_workers: maximum number of concurrent POST requests (defaults to self.max_workers)
+        :return: dataframe with the manifest and per row the "status" ("created", "dry run", "failed" or
+            "skipped") and a "message"
+        """
+        result_df = self.manifest_frame(manifest)
+
+        # fetch everything needed to resolve owners, contracts and names once
+        accounts_df = self.get_accounts() if result_df.owner.notna().any() else None
+        me_df = self.get_me() if result_df.owner.isna().any() else None
+        contracts_df = self.get_contracts()
+        projectfolders_df = self.get_projectfolders()
+
+        payloads = self.folder_payloads(result_df, accounts_df, me_df, contracts_df, projectfolders_df)
+
+        logging.info('Creating {} of {} project folders'.format(len(payloads), result_df.shape[0]))
+        if max_workers is None:
+            max_workers = self.max_workers
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            responses = executor.map(lambda payload: self.post(request='functional-account', payload=payload),
+                                     payloads.values())
+            self.record_responses(result_df, payloads, responses)
+
+        return result_df
+
+    @staticmethod
+    def manifest_frame(manifest):
+        """
+        get manifest of project folders to create as dataframe with defaults and the status columns
+        :param manifest: dataframe (or list of dictionaries), see create_folders
+        :return: dataframe with the manifest, all rows "skipped" without message
+        """
+        import pandas
+        result_df = pandas.DataFrame(manifest).reset_index(drop=True)
+        for column, default in [('name', None), ('description', ''), ('owner', None), ('contract', None),
+                                ('quotum', 10)]:
+            if column not in result_df.columns:
+                result_df[column] = default
+        result_df['status'] = 'skipped'
+        result_df['message'] = ''
+        return result_df
+
+    def folder_payloads(self, result_df, accounts_df, me_df, contracts_df, projectfolders_df):
+        """
+        validate the rows of a manifest and construct the payloads of the project folders to create; rows that
+        cannot be created get a message (and all rows fail if a listing needed could not be retrieved)
+        :param result_df: dataframe with manifest, see manifest_frame (updated in place)
+        :param accounts_df: dataframe with accounts (only needed if an owner is given)
+        :param me_df: dataframe with the current user (only needed if an owner is missing)
+        :param contracts_df: dataframe with contracts
+        :param projectfolders_df: dataframe with project folders
+        :return: dictionary with row: payload
+        """
+        import pandas
+        listings = [('accounts', accounts_df, result_df.owner.notna().any()),
+                    ('current user', me_df, result_df.owner.isna().any()),
+                    ('contracts', contracts_df, True),
+                    ('project folders', projectfolders_df, True)]
+        missing = [listing for listing, df, needed in listings if needed and df is None]
+        if len(missing) > 0:
+            logging.error('Could not retrieve {}; no project folders created'.format(', '.join(missing)))
+            result_df['status'] = 'failed'
+            result_df['message'] = 'Could not retrieve {}'.format(', '.join(missing))
+            return {}
+
+        me_username = me_df.username.values[0] if me_df is not None else None
+        names = set(self.get_index('functional-account', projectfolders_df, 'name'))
+        payloads = {}
+        for i, row in result_df.iterrows():
+            name = row['name']
+            if pandas.isna(name) or str(name).strip() == '':
+                result_df.loc[i, 'message'] = 'No name specified'
+                continue
+            if name in names:
+                result_df.loc[i, 'message'] = 'Project folder with name "{}" already exists'.format(name)
+                continue
+            quotum = self.parse_quotum(10 if pandas.isna(row['quotum']) else row['quotum'])
+            if quotum is None:
+                result_df.loc[i, 'message'] = 'Quotum "{}" is not a positive whole number of GB'.format(row['quotum'])
+                continue
+            if pandas.isna(row['owner']):
+                owner_username = me_username
             else:
-                idx = accounts_df.username == owner
+                owner_username = self.resolve_owner(row['owner'], accounts_df)
+            if owner_username is None:
+                result_df.loc[i, 'message'] = 'Owner "{}" not resolved'.format(row['owner'])
+                continue
+            contract_id = self.resolve_contract(None if pandas.isna(row['contract']) else row['contract'],
+                                                contracts_df)
+            if contract_id is None:
+                result_df.loc[i, 'message'] = 'Contract "{}" not resolved'.format(row['contract'])
+                continue
+            description = '' if pandas.isna(row['description']) else str(row['description'])
+            # reserve the name, so duplicates within the manifest are skipped as well
+            names.add(name)
+            payloads[i] = self.folder_payload(name, description=description, owner_username=owner_username,
+                                              contract_id=contract_id, quotum=quotum)
+        return payloads
 
-            if accounts_df.loc[idx].shape[0] == 1:
-                owner_username = accounts_df.loc[idx].username.values[0]
+    def record_responses(self, result_df, payloads, responses):
+        """
+        record the status of the created project folders in the manifest
+        :param result_df: dataframe with manifest, see manifest_frame (updated in place)
+        :param payloads: dictionary with row: payload, see folder_payloads
+        :param responses: json objects of the POST requests (None if failed), in the order of payloads
+        """
+        for i, data in zip(payloads, responses):
+            if data is None:
+                result_df.loc[i, 'status'] = 'failed'
+                result_df.loc[i, 'message'] = 'POST request failed'
+            elif self.dry_run:
+                result_df.loc[i, 'status'] = 'dry run'
             else:
-                logging.error('{} usernames found matching "{}"'.format(accounts_df.loc[idx].shape[0], owner))
-                return {}
+                result_df.loc[i, 'status'] = 'created'
+
+    @staticmethod
+    def parse_quotum(quotum):
+        """
+        parse storage quotum, e.g. read from a manifest as text
+        :param quotum: quotum in GB (integer, or float or string with an integer value)
+        :return: quotum as integer (None if not a positive whole number)
+        """
+        try:
+            value = float(str(quotum).strip())
+        except ValueError:
+            return None
+        if not value.is_integer() or value <= 0:
+            return None
+        return int(value)
 
-        contracts = self.get_contracts()
+    def get_index(self, request, df, column):
+        """
+        get hash index of a column of a listing; indexes are built once per fetched dataframe
+        :param request: request string of the listing (e.g. "account")
+        :param df: dataframe with the listing
+        :param column: column name
+        :return: dictionary with value: array of row positions (None if the column is not indexed; empty if the
+            listing has no such column, e.g. no project folders yet)
+        """
+        if column not in self.index_columns.get(request, ()):
+            return None
+        if column not in df.columns:
+            return {}
+        indexed_df, indexes = self._indexes.get(request, (None, {}))
+        if indexed_df is not df:
+            # new fetch of the listing: discard indexes of the previous dataframe
+            indexes = {}
+            self._indexes[request] = (df, indexes)
+        if column not in indexes:
+            indexes[column] = df.groupby(column, sort=False).indices
+        return indexes[column]
+
+    def lookup(self, request, df, criteria):
+        """
+        find rows of a listing matching all criteria, using the hash indexes where available
+        :param request: request string of the listing (e.g. "account")
+        :param df: dataframe with the listing
+        :param criteria: dictionary with column: value
+        :return: list of row positions
+        """
+        positions = None
+        remaining = {}
+        for column, value in criteria.items():
+            index = self.get_index(request, df, column)
+            if index is None:
+                remaining[column] = value
+                continue
+            matches = set(index.get(value, []))
+            positions = matches if positions is None else positions & matches
+
+        positions = list(range(df.shape[0])) if positions is None else sorted(positions)
+        if len(remaining) > 0 and len(positions) > 0:
+            # match criteria on columns without index on the remaining rows only
+            import pandas
+            selection = df.iloc[positions]
+            idx = (selection[list(remaining)] == pandas.Series(remaining)).all(axis=1).values
+            positions = [position for position, match in zip(positions, idx) if match]
+        return positions
+
+    def resolve_owner(self, owner, accounts_df):
+        """
+        resolve owner to the username of exactly one account
+        :param owner: username or dictionary with account fields to match (e.g. {'email': ...})
+        :param accounts_df: dataframe with accounts
+        :return: username (None if not exactly one account matches)
+        """
+        if type(owner) == type({}):
+            positions = self.lookup('account', accounts_df, owner)
+        else:
+            positions = self.lookup('account', accounts_df, {'username': owner})
+
+        if len(positions) == 1:
+            return accounts_df.username.values[positions[0]]
+        else:
+            logging.error('{} usernames found matching "{}"'.format(len(positions), owner))
+            return None
+
+    def resolve_contract(self, contract, contracts_df):
+        """
+        resolve contract to the id of exactly one contract
+        :param contract: id (integer), contract_id (string) or dictionary with contract fields to match; if None,
+            the only available contract is used
+        :param contracts_df: dataframe with contracts
+        :return: contract id (None if not exactly one contract matches)
+        """
+        import numpy
+        contracts = contracts_df
         if contract is None:
             if contracts.shape[0] == 1:
                 contract_id = contracts.id.values[0]
                 logging.debug('No contract specified, default to the only available contract: {}'.format(contract_id))
+                return contract_id
             else:
                 option_str = '; '.join(['{} ({})'.format(id, contract_id) for id,contract_id in contracts[['id', 'contract_id']].values.tolist()])
                 logging.error('No contract specified, {} options available. Choose from: {}'.format(contracts.shape[0],
                                                                                                     option_str))
-                return {}
-        else:
-            if type(contract) == type({}):
-                idx = (contracts[list(contract)] == pandas.Series(contract)).all(axis=1)
-            elif type(contract) == type(10):
-                idx = contracts.id == contract
-            elif type(contract) == type(''):
-                idx = contracts.contract_id == contract
-            else:
-                logging.error('contract of type "{}" not recognized'.format(type(contract)))
-                return {}
+                return None
 
-            if contracts.loc[idx].shape[0] == 1:
-                contract_id = contracts.loc[idx].id.values[0]
-            else:
-                logging.error('{} contracts found that match "{}"'.format(contracts.loc[idx].shape[0], contract))
-                return {}
+        if type(contract) == type({}):
+            positions = self.lookup('contract', contracts, contract)
+        elif isinstance(contract, (int, numpy.integer)):
+            positions = self.lookup('contract', contracts, {'id': contract})
+        elif type(contract) == type(''):
+            positions = self.lookup('contract', contracts, {'contract_id': contract})
+            if len(positions) == 0 and contract.isdigit():
+                # e.g. read from a manifest as text
+                positions = self.lookup('contract', contracts, {'id': int(contract)})
+        else:
+            logging.error('contract of type "{}" not recognized'.format(type(contract)))
+            return None
 
-        projectfolders_df = self.get_projectfolders()
-        if name in projectfolders_df.name.values:
-            logging.error('Project folder with name "{}" already exists'.format(name))
-            return {}
+        if len(positions) == 1:
+            return contracts.id.values[positions[0]]
+        else:
+            logging.error('{} contracts found that match "{}"'.format(len(positions), contract))
+            return None
 
+    @staticmethod
+    def folder_payload(name, description='', owner_username=None, contract_id=None, quotum=10):
+        """
+        construct payload to create a project folder
+        :param name: name of project folder
+        :param description: description of project folder
+        :param owner_username: username of owner
+        :param contract_id: id of contract
+        :param quotum: storage quotum in GB (integer)
+        :return: payload dictionary
+        """
         payload = {
                 "name": name,
                 "account": {
@@ -186,39 +1083,371 @@ class ResearchDrive:
                 },
                 "quotum": int(quotum)
               }
-
-        data = self.post(request='functional-account', payload=payload)
-
-        return data
+        return payload
 
     def get_contracts(self):
         """
         get available contracts
-        :return: dataframe with contracts
+        :return: dataframe with contracts (None if the request fails)
         """
-        contracts_df = pandas.json_normalize(self.get(request='contract')['data'])
+        import pandas
+        data = self.get(request='contract')
+        if data is None:
+            return None
+        contracts_df = pandas.json_normalize(data['data'])
         return contracts_df
 
-    def get_accounts(self):
+    def get_accounts(self, max_age=None):
         """
         get available accounts
+        :param max_age: maximum age in minutes of a snapshot to use (defaults to self.snapshot_max_age)
         :return: dataframe with accounts
         """
-        accounts_df = pandas.concat([pandas.json_normalize(d['data']) for d in self.get_many(request='account')])
+        accounts_df = self.load_snapshot('account', max_age=max_age)
+        if accounts_df is None and not self.offline:
+            accounts_df = self.get_frame(request='account')
+            self.save_snapshot('account', accounts_df)
         return accounts_df
 
     def get_me(self):
         """
         get information about current user
-        :return: dataframe with user information
+        :return: dataframe with user information (None if the request fails)
         """
-        me_df = pandas.json_normalize(self.get(request='me')['data'])
+        import pandas
+        data = self.get(request='me')
+        if data is None:
+            return None
+        me_df = pandas.json_normalize(data['data'])
         return me_df
 
-    def get_projectfolders(self):
+    def get_projectfolders(self, max_age=None, status=None, owner=None, contract=None, columns=None):
         """
         get available project folders
+
+        Filters in self.server_filters are passed to the API as query params, the other filters are applied while
+        the records are streamed into the dataframe. With snapshots enabled, the full listing is retrieved (and
+        stored) and filtered afterwards.
+        :param max_age: maximum age in minutes of a snapshot to use (defaults to self.snapshot_max_age)
+        :param status: status value or list of status values to include (e.g. "active")
+        :param owner: owner name or list of owner names to include
+        :param contract: contract id or list of contract ids to include
+        :param columns: list of (flattened) columns to include, e.g. ["name", "owner_name"], columns of fields no
+            project folder has are left out (default: all fields)
         :return: dataframe with project folders
         """
-        projectfolders_df = pandas.concat([pandas.json_normalize(d['data']) for d in self.get_many(request='functional-account')])
-        return projectfolders_df
\ No newline at end of file
+        filters = self.projectfolder_filters(status=status, owner=owner, contract=contract)
+
+        projectfolders_df = self.load_snapshot('functional-account', max_age=max_age)
+        if projectfolders_df is None and not self.offline:
+            if self.snapshot_dir is None and (len(filters) > 0 or columns is not None):
+                # filter and project while streaming, server-side where supported
+                params, client_filters = self.split_filters(filters)
+                return self.get_frame(request='functional-account', params=params, columns=columns,
+                                      predicate=self.record_predicate(client_filters))
+            projectfolders_df = self.get_frame(request='functional-account')
+            self.save_snapshot('functional-account', projectfolders_df)
+        if projectfolders_df is None:
+            return None
+        return self.select_projectfolders(projectfolders_df, filters, columns=columns)
+
+    @staticmethod
+    def projectfolder_filters(status=None, owner=None, contract=None):
+        """
+        collect filters of project folders
+        :param status: status value or list of status values
+        :param owner: owner name or list of owner names
+        :param contract: contract id or list of contract ids
+        :return: dictionary with filter name: list of values (only for the given filters)
+        """
+        filters = {}
+        for name, values in [('status', status), ('owner', owner), ('contract', contract)]:
+            if values is not None:
+                filters[name] = list(values) if isinstance(values, (list, tuple, set)) else [values]
+        return filters
+
+    def split_filters(self, filters):
+        """
+        split filters in query params for the filters the API applies server-side and the remaining filters
+        :param filters: dictionary with filter name: list of values
+        :return: tuple of dictionary with query params and dictionary with remaining filters
+        """
+        params = {}
+        client_filters = {}
+        for name, values in filters.items():
+            if name in self.server_filters:
+                params[self.server_filters[name]] = ','.join(str(value) for value in values)
+            else:
+                client_filters[name] = values
+        return params, client_filters
+
+    @staticmethod
+    def filter_value(value):
+        """
+        normalise a field or filter value to compare as text, e.g. contract ids may be given as integer or string
+        and become float in a dataframe column with missing values
+        :param value: field or filter value
+        :return: text of the value (None if the value is missing)
+        """
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return None
+        if isinstance(value, numbers.Real) and not isinstance(value, bool) and float(value).is_integer():
+            return str(int(value))
+        return str(value)
+
+    def record_predicate(self, filters):
+        """
+        get function selecting flattened project folder records that match all filters
+        :param filters: dictionary with filter name (see self.filter_fields): list of values
+        :return: function of a flattened record (None if there are no filters)
+        """
+        if len(filters) == 0:
+            return None
+        selection = [(self.filter_fields[name], set(map(self.filter_value, values)) - {None})
+                     for name, values in filters.items()]
+
+        def predicate(record):
+            return all(self.filter_value(record.get(field)) in values for field, values in selection)
+
+        return predicate
+
+    def select_projectfolders(self, projectfolders_df, filters, columns=None):
+        """
+        select project folders that match all filters and the given columns from a dataframe
+        :param projectfolders_df: dataframe with project folders
+        :param filters: dictionary with filter name (see self.filter_fields): list of values
+        :param columns: list of columns to include, columns of fields no project folder has are left out
+            (default: all columns)
+        :return: dataframe with project folders
+        """
+        if len(filters) == 0 and columns is None:
+            return projectfolders_df
+        import numpy
+        selected = numpy.ones(len(projectfolders_df), dtype=bool)
+        for name, values in filters.items():
+            field = self.filter_fields[name]
+            if field not in projectfolders_df.columns:
+                selected[:] = False
+                continue
+            # same normalisation as record_predicate, so streamed and snapshot selections agree
+            values = set(map(self.filter_value, values)) - {None}
+            selected &= projectfolders_df[field].map(self.filter_value).isin(values).values
+        projectfolders_df = projectfolders_df.loc[selected].reset_index(drop=True)
+        if columns is not None:
+            projectfolders_df = projectfolders_df[[column for column in columns if column in projectfolders_df.columns]]
+        return projectfolders_df
+
+    def sync_projectfolders(self, params=None):
+        """
+        incrementally synchronise the local store of project folders with the Research Drive API
+
+        The local store is keyed by folder id and keeps a fingerprint of every page. Pages with an unchanged
+        fingerprint are taken from the store as a whole; only records on changed pages are compared one by one.
+        The store is kept in memory and, if self.snapshot_dir is set, persisted as
+        <snapshot_dir>/functional-account.sync.json. Listings with params have a store of their own (see
+        sync_store_key) and only the full listing is stored as snapshot.
+        :param params: dictionary with params to parse (e.g. server-side sorting or filters)
+        :return: tuple of dataframe with all project folders and dictionary with dataframes of "added", "removed"
+            and "modified" project folders (None, None if the listing could not be retrieved)
+        """
+        store = self.load_sync_store('functional-account', params=params)
+        pages = self.get_many(request='functional-account', params=params, parallel=True)
+        if pages is None:
+            return None, None
+        return self.merge_sync_pages(store, pages, params=params)
+
+    def merge_sync_pages(self, store, pages, params=None):
+        """
+        compare pages of the project folder listing with the local store and update the store and the snapshot
+        :param store: local store of project folders, see load_sync_store
+        :param pages: list of json objects, one per page of the listing
+        :param params: dictionary with params of the listing (the snapshot is only updated without params)
+        :return: tuple of dataframe with all project folders and dictionary with dataframes of "added", "removed"
+            and "modified" project folders
+        """
+        new_store = {'pages': {}, 'records': {}}
+        added, modified = [], []
+        for page in pages:
+            page_number = str(page['meta']['current_page'])
+            page_hash = self.fingerprint(page['data'])
+            ids = [str(record[self.sync_key]) for record in page['data']]
+            new_store['pages'][page_number] = {'hash': page_hash, 'ids': ids}
+
+            old_page = store['pages'].get(page_number)
+            if old_page is not None and old_page['hash'] == page_hash:
+                # unchanged page: records are identical to those in the store
+                for id in ids:
+                    new_store['records'][id] = store['records'][id]
+                continue
+
+            for id, record in zip(ids, page['data']):
+                record_hash = self.fingerprint(record)
+                if id not in store['records']:
+                    added.append(record)
+                elif store['records'][id]['hash'] != record_hash:
+                    modified.append(record)
+                new_store['records'][id] = {'hash': record_hash, 'record': record}
+
+        removed = [store['records'][id]['record'] for id in store['records'] if id not in new_store['records']]
+        self.save_sync_store('functional-account', new_store, params=params)
+        logging.info('Synchronised project folders: {} added, {} removed, {} modified'.format(len(added),
+                                                                                              len(removed),
+                                                                                              len(modified)))
+
+        import pandas
+        projectfolders_df = pandas.json_normalize([item['record'] for item in new_store['records'].values()])
+        if not params:
+            # a filtered listing must not replace the snapshot of the full listing
+            self.save_snapshot('functional-account', projectfolders_df)
+        diff = {'added': pandas.json_normalize(added),
+                'removed': pandas.json_normalize(removed),
+                'modified': pandas.json_normalize(modified)}
+        return projectfolders_df, diff
+
+    @staticmethod
+    def fingerprint(data):
+        """
+        compute fingerprint of json object
+        :param data: json object
+        :return: hexadecimal hash string
+        """
+        return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def sync_store_key(self, request, params=None):
+        """
+        get key of the local store used for incremental synchronisation of a listing, e.g. "functional-account" or,
+        for a listing with params, "functional-account.<fingerprint of params>"
+        :param request: request string of the listing (e.g. "functional-account")
+        :param params: dictionary with params of the listing
+        :return: key, also used as the name of the store file
+        """
+        key = request.replace('/', '_')
+        if params:
+            key = '{}.{}'.format(key, self.fingerprint(params)[:12])
+        return key
+
+    def load_sync_store(self, request, params=None):
+        """
+        get local store used for incremental synchronisation of a listing
+        :param request: request string of the listing (e.g. "functional-account")
+        :param params: dictionary with params of the listing
+        :return: dictionary with "pages" and "records"
+        """
+        key = self.sync_store_key(request, params=params)
+        if key in self._sync_stores:
+            return self._sync_stores[key]
+        store = {'pages': {}, 'records': {}}
+        if self.snapshot_dir is not None:
+            store_file = os.path.join(self.snapshot_dir, '{}.sync.json'.format(key))
+            if os.path.exists(store_file):
+                with open(store_file, encoding='utf-8') as f:
+                    store = json.load(f)
+        self._sync_stores[key] = store
+        return store
+
+    def save_sync_store(self, request, store, params=None):
+        """
+        keep local store used for incremental synchronisation of a listing in memory and in the snapshot directory
+        :param request: request string of the listing (e.g. "functional-account")
+        :param store: dictionary with "pages" and "records"
+        :param params: dictionary with params of the listing
+        """
+        key = self.sync_store_key(request, params=params)
+        self._sync_stores[key] = store
+        if self.snapshot_dir is None:
+            return
+        if not os.path.exists(self.snapshot_dir):
+            os.makedirs(self.snapshot_dir)
+        store_file = os.path.join(self.snapshot_dir, '{}.sync.json'.format(key))
+        with open(store_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(store, f)
+        os.replace(store_file + '.tmp', store_file)
+
+    def snapshot_file(self, request):
+        """
+        get path of the on-disk snapshot of a listing
+        :param request: request string of the listing (e.g. "functional-account")
+        :return: path of Parquet file (None if snapshots are disabled)
+        """
+        if self.snapshot_dir is None:
+            return None
+        return os.path.join(self.snapshot_dir, '{}.parquet'.format(request.replace('/', '_')))
+
+    def save_snapshot(self, request, df):
+        """
+        store listing as Parquet file, including the time of retrieval, in the snapshot directory
+        :param request: request string of the listing (e.g. "functional-account")
+        :param df: dataframe with listing
+        :return: path of Parquet file (None if the snapshot is not stored)
+        """
+        snapshot_file = self.snapshot_file(request)
+        if snapshot_file is None or df is None:
+            return None
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            logging.error('pyarrow is required for on-disk snapshots; snapshot of {} not stored'.format(request))
+            return None
+
+        if not os.path.exists(self.snapshot_dir):
+            os.makedirs(self.snapshot_dir)
+        timestamp = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+        try:
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[b'researchdrive.timestamp'] = timestamp.encode()
+            # write to temporary file first, so readers never see a partially written snapshot
+            pyarrow.parquet.write_table(table.replace_schema_metadata(metadata), snapshot_file + '.tmp')
+            os.replace(snapshot_file + '.tmp', snapshot_file)
+        except (pyarrow.ArrowException, OSError) as e:
+            logging.error('Snapshot of {} could not be stored in "{}": {}'.format(request, snapshot_file, e))
+            return None
+        logging.debug('Snapshot of {} stored in "{}"'.format(request, snapshot_file))
+        return snapshot_file
+
+    def snapshot_timestamp(self, request):
+        """
+        get time of retrieval of the on-disk snapshot of a listing
+        :param request: request string of the listing (e.g. "functional-account")
+        :return: timezone aware datetime (None if no snapshot is available)
+        """
+        snapshot_file = self.snapshot_file(request)
+        if snapshot_file is None or not os.path.exists(snapshot_file):
+            return None
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            logging.error('pyarrow is required for on-disk snapshots')
+            return None
+        metadata = pyarrow.parquet.read_schema(snapshot_file).metadata or {}
+        if b'researchdrive.timestamp' not in metadata:
+            return None
+        return datetime.datetime.fromisoformat(metadata[b'researchdrive.timestamp'].decode())
+
+    def load_snapshot(self, request, max_age=None):
+        """
+        read listing from the on-disk snapshot if it is recent enough (or regardless of its age in offline mode)
+        :param request: request string of the listing (e.g. "functional-account")
+        :param max_age: maximum age in minutes (defaults to self.snapshot_max_age)
+        :return: dataframe with listing (None if no suitable snapshot is available)
+        """
+        if max_age is None:
+            max_age = self.snapshot_max_age
+        if max_age is None and not self.offline:
+            return None
+
+        timestamp = self.snapshot_timestamp(request)
+        if timestamp is None:
+            if self.offline:
+                logging.error('Offline mode, but no snapshot of {} available in "{}"'.format(request, self.snapshot_dir))
+            return None
+
+        age = (datetime.datetime.now(tz=datetime.timezone.utc) - timestamp).total_seconds() / 60
+        if not self.offline and age > max_age:
+            logging.debug('Snapshot of {} is {:.1f} minutes old; ignored'.format(request, age))
+            return None
+
+        logging.info('Reading {} from snapshot of {} ({:.1f} minutes old)'.format(request, timestamp.isoformat(), age))
+        import pandas
+        return pandas.read_parquet(self.snapshot_file(request))
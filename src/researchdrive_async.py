@@ -0,0 +1,424 @@
+import logging
+import json
+import asyncio
+import functools
+import itertools
+from collections import deque
+import httpx
+from researchdrive import ResearchDrive, FrameBuilder
+
+
+class AsyncResearchDrive(ResearchDrive):
+    """
+    An asyncio wrapper for interacting with the SURF Research Drive API.
+
+    This class offers the same methods as ResearchDrive as coroutines, running over a pooled httpx.AsyncClient.
+    Pages of paginated requests are fetched concurrently. Helpers that do not call the API (e.g. resolve_owner,
+    resolve_contract and the snapshots) are shared with ResearchDrive; snapshots are read and written in a thread.
+
+    Attributes:
+        session (httpx.AsyncClient): Persistent asynchronous HTTP client shared by all API calls.
+    """
+
+    def create_session(self):
+        """
+        create asynchronous HTTP client with a pool of keep-alive connections; headers are stored once in the client
+        :return: httpx.AsyncClient
+        """
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.AsyncClient(headers=self.headers, limits=limits, timeout=self.timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def __enter__(self):
+        raise TypeError('Use "async with" for AsyncResearchDrive')
+
+    async def close(self):
+        """
+        close the HTTP client and the connections in its pool
+        """
+        await self.session.aclose()
+
+    async def send(self, method, url, retry_statuses=None, **kwargs):
+        """
+        send HTTP request over the client, with rate limiting and retries with exponential backoff
+        :param method: HTTP method ("GET" or "POST")
+        :param url: full url
+        :param retry_statuses: HTTP status codes to retry (defaults to self.retry_statuses)
+        :param kwargs: keyword arguments passed to httpx.AsyncClient.request
+        :return: response (None if no response was received)
+        """
+        if retry_statuses is None:
+            retry_statuses = self.retry_statuses
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await asyncio.sleep(self.rate_limiter.reserve())
+            try:
+                r = await self.session.request(method, url, **kwargs)
+                reason = 'status code {}'.format(r.status_code)
+            except httpx.HTTPError as e:
+                r = None
+                reason = e.__class__.__name__
+
+            if r is not None and r.status_code not in retry_statuses:
+                return r
+            if r is None and method != 'GET':
+                # the request might have been processed; only GET requests are safe to resend
+                return r
+            if attempt >= self.retries:
+                return r
+
+            delay = self.retry_delay(attempt, r)
+            logging.warning('{} request to {} failed with {}; retry {} of {} in {:.1f} s'.format(method, url, reason,
+                                                                                              attempt + 1,
+                                                                                              self.retries,
+                                                                                              delay))
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    async def to_thread(func, *args, **kwargs):
+        """
+        run blocking function (e.g. reading or writing a snapshot) in a thread, so the event loop is not blocked
+        (like asyncio.to_thread, which requires Python >= 3.9)
+        :param func: function
+        :param args: positional arguments passed to func
+        :param kwargs: keyword arguments passed to func
+        :return: return value of func
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def get(self, request='me', params=None):
+        """
+        get call to Research Drive API
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param params: dictionary with params to parse
+        :return: json object (if http status code == 200, None otherwise)
+        """
+        if params is None:
+            params = {}
+        url = self.url + request
+
+        if self.cache is not None:
+            data = self.cache.get(request, params)
+            if data is not None:
+                logging.debug('GET request to {} served from cache'.format(url))
+                return data
+
+        r = await self.send('GET', url, params=params)
+        if r is None:
+            logging.error('GET request to {} does not give valid response'.format(url))
+            return None
+
+        if r.status_code == 200:
+            data = json.loads(r.text)
+            if self.cache is not None:
+                self.cache.set(request, params, data)
+            return data
+        else:
+            logging.error('GET request to {} gives status code {}\n{}'.format(url, r.status_code, r.text))
+            return None
+
+    async def iter_pages(self, request='account', per_page=50, params=None, parallel=True, max_workers=None):
+        """
+        asynchronous generator of pages of a paginated Research Drive API request, yielded as they arrive
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param per_page: number of records per page
+        :param params: dictionary with params to parse
+        :param parallel: if True, fetch the first page and subsequently the remaining pages concurrently
+        :param max_workers: maximum number of concurrent requests in parallel mode (defaults to self.max_workers)
+        :return: asynchronous generator of json objects, one per page in page order (stops at the first page that
+            fails)
+        """
+        if params is None:
+            params = {}
+        params = dict(params, per_page=per_page)
+
+        # get first page and read meta information
+        data = await self.get(request=request, params=dict(params, page=1))
+        if data is None:
+            return
+        yield data
+        current_page = data['meta']['current_page']
+        last_page = data['meta']['last_page']
+
+        if not parallel:
+            max_workers = 1
+        elif max_workers is None:
+            max_workers = self.max_workers
+        pages = iter(range(current_page + 1, last_page + 1))
+        # keep at most max_workers pages in flight, so only a few pages are held in memory
+        tasks = deque(asyncio.ensure_future(self.get(request=request, params=dict(params, page=page)))
+                      for page in itertools.islice(pages, max(1, max_workers)))
+        try:
+            while tasks:
+                data = await tasks.popleft()
+                if data is None:
+                    return
+                page = next(pages, None)
+                if page is not None:
+                    tasks.append(asyncio.ensure_future(self.get(request=request, params=dict(params, page=page))))
+                yield data
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def iter_records(self, request='account', per_page=50, params=None, parallel=True, max_workers=None):
+        """
+        asynchronous generator of records of a paginated Research Drive API request, yielded as the pages arrive
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param per_page: number of records per page
+        :param params: dictionary with params to parse
+        :param parallel: if True, fetch the first page and subsequently the remaining pages concurrently
+        :param max_workers: maximum number of concurrent requests in parallel mode (defaults to self.max_workers)
+        :return: asynchronous generator of json records
+        """
+        async for data in self.iter_pages(request=request, per_page=per_page, params=params, parallel=parallel,
+                                          max_workers=max_workers):
+            for record in data['data']:
+                yield record
+
+    async def get_many(self, request='account', per_page=50, params=None, parallel=True, max_workers=None):
+        """
+        series of get calls to Research Drive API
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param per_page: number of records per page
+        :param params: dictionary with params to parse
+        :param parallel: if True, fetch the first page and subsequently all remaining pages concurrently
+        :param max_workers: maximum number of concurrent requests in parallel mode (defaults to self.max_workers)
+        :return: list of json objects, one per page in page order (None if any of the pages fails)
+        """
+        data = [d async for d in self.iter_pages(request=request, per_page=per_page, params=params,
+                                                 parallel=parallel, max_workers=max_workers)]
+        if len(data) == 0 or data[-1]['meta']['current_page'] < data[-1]['meta']['last_page']:
+            logging.error('Not all pages of GET request to {} could be retrieved'.format(request))
+            return None
+
+        return data
+
+    async def get_frame(self, request='account', per_page=50, params=None, parallel=True, columns=None,
+                        predicate=None):
+        """
+        get all records of a paginated Research Drive API request as dataframe, built while the pages arrive
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param per_page: number of records per page
+        :param params: dictionary with params to parse
+        :param parallel: if True, fetch the first page and subsequently the remaining pages concurrently
+        :param columns: list of (flattened) columns to keep (default: all fields)
+        :param predicate: function of a flattened record, returning False for records to skip (optional)
+        :return: dataframe with one row per record (None if any of the pages fails)
+        """
+        builder = None
+        meta = None
+        async for data in self.iter_pages(request=request, per_page=per_page, params=params, parallel=parallel):
+            meta = data['meta']
+            if builder is None:
+                builder = FrameBuilder(size=meta.get('total'), columns=columns, predicate=predicate,
+                                       schema=self._record_schemas.get(request))
+            builder.extend(data['data'])
+
+        if meta is None or meta['current_page'] < meta['last_page']:
+            logging.error('Not all pages of GET request to {} could be retrieved'.format(request))
+            return None
+
+        if builder.schema is not None:
+            self._record_schemas[request] = builder.schema
+        return builder.to_frame()
+
+    async def post(self, request='', payload=None):
+        """
+        post call to Research Drive API
+        :param request: request string (excluding https://<environment_domain>/dashboard/api/)
+        :param payload: payload dictionary
+        :return: json object (if http status code == 200, None otherwise)
+        """
+        if payload is None:
+            payload = {}
+        url = self.url + request
+
+        if self.dry_run:
+            logging.info('Dry run, returning payload of POST request')
+            return payload
+
+        r = await self.send('POST', url, retry_statuses=self.post_retry_statuses, content=json.dumps(payload))
+        if r is None:
+            logging.error('POST request to {} does not give valid response'.format(url))
+            return None
+
+        if r.status_code == 200:
+            data = json.loads(r.text)
+            if self.cache is not None:
+                # cached listings of this endpoint are outdated after a successful POST
+                self.cache.invalidate(request)
+            return data
+        else:
+            logging.error('POST request to {} gives status code {}\n{}'.format(url, r.status_code, r.text))
+            return None
+
+    async def create_folder(self, name, description='', owner=None, contract=None, quotum=10):
+        """
+        create Research Drive project folder
+        :param name: name of project folder
+        :param description: description of project folder (optional)
+        :param owner: owner of project folder; will default to "me" being the user owning the API access token
+        :param contract: id (integer), contract_id (string) or dictionary with contract fields to match
+        :param quotum: storage quotum in GB (integer)
+        :return: json object of created project folder ({} if the project folder cannot be created)
+        """
+        # fetch owner, contracts and project folders concurrently
+        quotum_gb = self.parse_quotum(quotum)
+        if quotum_gb is None:
+            logging.error('Quotum "{}" is not a positive whole number of GB'.format(quotum))
+            return {}
+
+        owner_task = self.get_me() if owner is None else self.get_accounts()
+        owner_df, contracts_df, projectfolders_df = await asyncio.gather(owner_task,
+                                                                         self.get_contracts(),
+                                                                         self.get_projectfolders())
+        missing = [listing for listing, df in [('accounts' if owner is not None else 'current user', owner_df),
+                                               ('contracts', contracts_df),
+                                               ('project folders', projectfolders_df)] if df is None]
+        if len(missing) > 0:
+            logging.error('Could not retrieve {}'.format(', '.join(missing)))
+            return {}
+
+        if owner is None:
+            owner_username = owner_df.username.values[0]
+        else:
+            owner_username = self.resolve_owner(owner, owner_df)
+            if owner_username is None:
+                return {}
+
+        contract_id = self.resolve_contract(contract, contracts_df)
+        if contract_id is None:
+            return {}
+
+        if name in self.get_index('functional-account', projectfolders_df, 'name'):
+            logging.error('Project folder with name "{}" already exists'.format(name))
+            return {}
+
+        payload = self.folder_payload(name, description=description, owner_username=owner_username,
+                                      contract_id=contract_id, quotum=quotum_gb)
+
+        data = await self.post(request='functional-account', payload=payload)
+
+        return data
+
+    async def create_folders(self, manifest, max_workers=None):
+        """
+        create series of Research Drive project folders (see ResearchDrive.create_folders)
+        :param manifest: dataframe (or list of dictionaries) with columns "name" and optionally "description",
+            "owner" (username; defaults to "me"), "contract" (contract_id or id) and "quotum" (GB; defaults to 10)
+        :param max_workers: maximum number of concurrent POST requests (defaults to self.max_workers)
+        :return: dataframe with the manifest and per row the "status" ("created", "dry run", "failed" or
+            "skipped") and a "message"
+        """
+        result_df = self.manifest_frame(manifest)
+
+        # fetch everything needed to resolve owners, contracts and names once, concurrently
+        async def nothing():
+            return None
+
+        accounts_df, me_df, contracts_df, projectfolders_df = await asyncio.gather(
+            self.get_accounts() if result_df.owner.notna().any() else nothing(),
+            self.get_me() if result_df.owner.isna().any() else nothing(),
+            self.get_contracts(),
+            self.get_projectfolders())
+
+        payloads = self.folder_payloads(result_df, accounts_df, me_df, contracts_df, projectfolders_df)
+
+        logging.info('Creating {} of {} project folders'.format(len(payloads), result_df.shape[0]))
+        if max_workers is None:
+            max_workers = self.max_workers
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def post(payload):
+            async with semaphore:
+                return await self.post(request='functional-account', payload=payload)
+
+        responses = await asyncio.gather(*(post(payload) for payload in payloads.values()))
+        self.record_responses(result_df, payloads, responses)
+
+        return result_df
+
+    async def sync_projectfolders(self, params=None):
+        """
+        incrementally synchronise the local store of project folders with the Research Drive API (see
+        ResearchDrive.sync_projectfolders)
+        :param params: dictionary with params to parse (e.g. server-side sorting or filters)
+        :return: tuple of dataframe with all project folders and dictionary with dataframes of "added", "removed"
+            and "modified" project folders (None, None if the listing could not be retrieved)
+        """
+        # the store and the snapshot are read and written in a thread, so the event loop is not blocked
+        store = await self.to_thread(self.load_sync_store, 'functional-account', params=params)
+        pages = await self.get_many(request='functional-account', params=params, parallel=True)
+        if pages is None:
+            return None, None
+        return await self.to_thread(self.merge_sync_pages, store, pages, params=params)
+
+    async def get_contracts(self):
+        """
+        get available contracts
+        :return: dataframe with contracts (None if the request fails)
+        """
+        import pandas
+        data = await self.get(request='contract')
+        if data is None:
+            return None
+        contracts_df = pandas.json_normalize(data['data'])
+        return contracts_df
+
+    async def get_accounts(self, max_age=None):
+        """
+        get available accounts
+        :param max_age: maximum age in minutes of a snapshot to use (defaults to self.snapshot_max_age)
+        :return: dataframe with accounts
+        """
+        accounts_df = await self.to_thread(self.load_snapshot, 'account', max_age=max_age)
+        if accounts_df is None and not self.offline:
+            accounts_df = await self.get_frame(request='account')
+            await self.to_thread(self.save_snapshot, 'account', accounts_df)
+        return accounts_df
+
+    async def get_me(self):
+        """
+        get information about current user
+        :return: dataframe with user information (None if the request fails)
+        """
+        import pandas
+        data = await self.get(request='me')
+        if data is None:
+            return None
+        me_df = pandas.json_normalize(data['data'])
+        return me_df
+
+    async def get_projectfolders(self, max_age=None, status=None, owner=None, contract=None, columns=None):
+        """
+        get available project folders (see ResearchDrive.get_projectfolders for the filters)
+        :param max_age: maximum age in minutes of a snapshot to use (defaults to self.snapshot_max_age)
+        :param status: status value or list of status values to include (e.g. "active")
+        :param owner: owner name or list of owner names to include
+        :param contract: contract id or list of contract ids to include
+        :param columns: list of (flattened) columns to include, e.g. ["name", "owner_name"] (default: all fields)
+        :return: dataframe with project folders
+        """
+        filters = self.projectfolder_filters(status=status, owner=owner, contract=contract)
+
+        projectfolders_df = await self.to_thread(self.load_snapshot, 'functional-account', max_age=max_age)
+        if projectfolders_df is None and not self.offline:
+            if self.snapshot_dir is None and (len(filters) > 0 or columns is not None):
+                # filter and project while streaming, server-side where supported
+                params, client_filters = self.split_filters(filters)
+                return await self.get_frame(request='functional-account', params=params, columns=columns,
+                                            predicate=self.record_predicate(client_filters))
+            projectfolders_df = await self.get_frame(request='functional-account')
+            await self.to_thread(self.save_snapshot, 'functional-account', projectfolders_df)
+        if projectfolders_df is None:
+            return None
+        return self.select_projectfolders(projectfolders_df, filters, columns=columns)
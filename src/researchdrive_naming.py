@@ -0,0 +1,111 @@
+import re
+
+
+class NamingConvention:
+    """
+    A classifier of project folder names following the convention <project number>_<domain>_<project name>.
+
+    All fields are derived from a single pass of one precompiled pattern with named groups, so classifying scales
+    linearly with the number of project folders. The pattern has no lookarounds, so it runs vectorized in pyarrow
+    (RE2) if available. Project numbers can be mapped to a domain explicitly, overriding the domain in the name.
+
+    Attributes:
+        domains (list): Domain codes (e.g. ["BE", "WF"]).
+        mapping (dict): Domain per project number, overriding the domain in the name.
+        pattern (re.Pattern): Combined pattern with the named groups digits (leading digits), domain (domain
+            between underscores following the digits) and convention (first character of the project name).
+        columns (list): Columns derived from the names by classify.
+    """
+    columns = ['project_number', 'domain', 'name_convention', 'test']
+
+    def __init__(self, domains, mapping=None):
+        """
+        initialise NamingConvention class
+        :param domains: list of domain codes
+        :param mapping: dictionary with domain: list of project numbers, applied in order (optional)
+        """
+        self.domains = [domain.strip().upper() for domain in domains if domain.strip()]
+        self.mapping = {}
+        if mapping is not None:
+            for domain, project_numbers in mapping.items():
+                for project_number in project_numbers:
+                    self.mapping[project_number] = domain
+        self.pattern = re.compile(r'^(?P<digits>[0-9]*)(?:_(?P<domain>' + '|'.join(map(re.escape, self.domains)) +
+                                  r')_(?P<convention>[0-9a-zA-Z-])?)?')
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        create classifier from the [GENERAL] domains and the [MAPPING] of a config file
+        :param config: configparser.ConfigParser
+        :return: NamingConvention
+        """
+        domains = config['GENERAL']['domains'].upper().split(',')
+        mapping = {}
+        if config.has_section('MAPPING'):
+            for key in config['MAPPING']:
+                mapping[key.upper()] = config['MAPPING'][key].upper().split(',')
+        return cls(domains, mapping=mapping)
+
+    def extract(self, names):
+        """
+        extract the named groups of the pattern from project folder names, vectorized in pyarrow if available
+        :param names: series with project folder names
+        :return: dataframe with one column per named group (missing if the group does not participate in the match)
+        """
+        import pandas
+        try:
+            import pyarrow
+            import pyarrow.compute
+        except ImportError:
+            return names.str.extract(self.pattern)
+        struct = pyarrow.compute.extract_regex(pyarrow.array(names, type=pyarrow.string(), from_pandas=True),
+                                               self.pattern.pattern)
+        groups = pandas.DataFrame({group: struct.field(group).to_pandas() for group in self.pattern.groupindex})
+        groups.index = names.index
+        # groups not participating in the match are empty
+        return groups.where(groups != '')
+
+    def classify(self, names):
+        """
+        classify project folder names
+        :param names: series with project folder names
+        :return: dataframe with columns project_number, domain, name_convention and test, with the index of names
+        """
+        import pandas
+        groups = self.extract(names)
+        n_digits = groups['digits'].str.len().fillna(0).values
+        nonzero = ~groups['digits'].str.startswith('0').fillna(True).values
+        # project numbers are defined as 6 digit numbers starting with nonzero
+        project_number = groups['digits'].str.slice(0, 6).where(nonzero & (n_digits >= 6))
+        # domain is the element following a 4-6 digit number
+        domain = groups['domain'].where((n_digits >= 4) & (n_digits <= 6))
+        if len(self.mapping) > 0:
+            domain = project_number.map(self.mapping).fillna(domain)
+        # the name convention requires a 6 digit number, a domain and a project name
+        name_convention = groups['convention'].notna().values & (n_digits == 6)
+        # a project folder is considered as test if it does not start with a 4-6 digit number OR if both domain and
+        # project number are not available
+        test = ~(nonzero & (n_digits >= 4)) | (domain.isna() & project_number.isna()).values
+        return pandas.DataFrame({'project_number': project_number,
+                                 'domain': domain,
+                                 'name_convention': name_convention,
+                                 'test': test},
+                                index=names.index)
+
+    def match(self, name):
+        """
+        classify a single project folder name, e.g. to validate a new name
+        :param name: project folder name
+        :return: dictionary with project_number, domain (None if not available), name_convention and test
+        """
+        groups = self.pattern.match(name).groupdict()
+        digits = groups['digits']
+        nonzero = digits[:1] not in ('', '0')
+        project_number = digits[:6] if nonzero and len(digits) >= 6 else None
+        domain = groups['domain'] if 4 <= len(digits) <= 6 else None
+        domain = self.mapping.get(project_number, domain)
+        return {'project_number': project_number,
+                'domain': domain,
+                'name_convention': groups['convention'] is not None and len(digits) == 6,
+                'test': not (nonzero and len(digits) >= 4) or (domain is None and project_number is None)}
@@ -0,0 +1,152 @@
+import logging
+from logging.handlers import TimedRotatingFileHandler
+import sys
+import argparse
+import os
+import datetime
+import configparser
+try:
+    from .researchdrive_startup import profile_startup
+except ImportError:
+    # run as script or executable
+    from researchdrive_startup import profile_startup
+
+# pandas is imported where needed; profile the imports from here on if requested (when not run as script, e.g. as
+# console script, main starts profiling)
+if __name__ == '__main__':
+    profile_startup()
+import researchdrive
+
+
+def read_manifest(manifest_file):
+    """
+    read manifest with project folders to create
+    :param manifest_file: .csv or .xlsx file with columns name, description, owner, contract and quotum
+    :return: dataframe with manifest (None if the file type is not supported)
+    """
+    import pandas
+    ext = os.path.splitext(manifest_file)[-1].lower()
+    if ext == '.csv':
+        df = pandas.read_csv(manifest_file, dtype=str, keep_default_na=False, na_values=[''])
+    elif ext == '.xlsx':
+        df = pandas.read_excel(manifest_file, dtype=str)
+    else:
+        logging.error('Extension "{}" is not supported.'.format(ext))
+        return None
+    # ignore surrounding whitespace in column names
+    df.columns = [column.strip() for column in df.columns]
+    return df
+
+
+def write_result(result_file, result_df):
+    """
+    write per-row result of bulk creation
+    :param result_file: .csv or .xlsx file
+    :param result_df: dataframe with manifest, status and message
+    """
+    if os.path.splitext(result_file)[-1].lower() == '.xlsx':
+        result_df.to_excel(result_file, index=False)
+    else:
+        result_df.to_csv(result_file, index=False)
+
+
+def main():
+    # no-op if the imports are profiled already
+    profile_startup()
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    if getattr(sys, 'frozen', False):
+        # we are running as executable (pyinstaller)
+        base_dir = os.path.dirname(os.path.abspath(sys.executable))
+        base_name = os.path.basename(sys.executable)
+        logging.info('Running Executable:')
+    else:
+        # we are running in a normal Python environment
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        base_name = os.path.basename(__file__)
+        logging.info('Running Script:')
+
+    stem = os.path.splitext(base_name)[0]
+
+    logging.info(' Path: {}'.format(base_dir))
+    logging.info(' Name: {}'.format(base_name))
+    logging.info(' Stem: {}'.format(stem))
+
+    default_configfile = os.path.join(base_dir, stem + '.cfg')
+    default_logfile = os.path.join(base_dir, stem + '.log')
+    if not os.path.exists(default_configfile):
+        default_configfile = None
+
+    parser = argparse.ArgumentParser(
+        description='Create project folders in SURF Research Drive API from a .csv or .xlsx manifest')
+    parser.add_argument('-c', '--config-file', default=default_configfile, help='Config file')
+    parser.add_argument('-f', '--file', required=True, help='Manifest (.csv or .xlsx) with columns name, description, owner, contract and quotum')
+    parser.add_argument('-o', '--output-file', default=None, help='File path to the resulting .csv or .xlsx file with the status per row')
+    parser.add_argument('-w', '--workers', default=None, type=int, help='Maximum number of project folders created concurrently')
+    parser.add_argument('-d', '--dry-run', action='store_true', help='Do not create project folders, only report what would be done')
+    parser.add_argument('-l', '--log-file', default=default_logfile, help='File path to log file')
+    parser.add_argument('--profile-startup', action='store_true', help='Log the time spent importing dependencies when the run ends')
+    args = parser.parse_args()
+
+    if args.log_file is not None:
+        args.log_file = os.path.abspath(args.log_file)
+        rootLogger = logging.getLogger()
+        logFormatter = logging.Formatter("%(asctime)s [%(threadName)-12.12s] [%(levelname)-5.5s]  %(message)s")
+        fileHandler = TimedRotatingFileHandler(args.log_file,
+                                               when="midnight",
+                                               interval=1,
+                                               backupCount=5)
+        fileHandler.setFormatter(logFormatter)
+        rootLogger.addHandler(fileHandler)
+
+    args_txt = ''
+    for key,val in vars(args).items():
+        args_txt += '\t{}: {}\n'.format(key, val)
+
+    logging.info('Starting Application to create SURF Research Drive project folders in bulk with\n{}'.format(args_txt))
+
+    if args.config_file is None:
+        logging.error('No config file provided. EXITING...')
+        return
+    if not os.path.exists(args.config_file):
+        logging.error('Config file "{}" does not exist. EXITING...'.format(args.config_file))
+        return
+    if not os.path.exists(args.file):
+        logging.error('Manifest "{}" does not exist. EXITING...'.format(args.file))
+        return
+
+    config = configparser.ConfigParser()
+    config.read(args.config_file)
+
+    # url may be set explicitly, e.g. to use a local stand-in of the API
+    api_url = config['API'].get('url', fallback='https://{}/dashboard/api/'.format(config['API']['environment_domain']))
+    api_key = config['API']['key']
+
+    manifest_df = read_manifest(args.file)
+    if manifest_df is None:
+        return
+    if 'name' not in manifest_df.columns:
+        logging.error('Manifest "{}" has no column "name". EXITING...'.format(args.file))
+        return
+
+    with researchdrive.ResearchDrive(url=api_url, token=api_key) as ResearchDriveAPI:
+        ResearchDriveAPI.dry_run = args.dry_run or config['API'].get('dry_run') == 'True'
+        if ResearchDriveAPI.dry_run:
+            logging.info('Research Drive API is called in DRY-RUN mode')
+        result_df = ResearchDriveAPI.create_folders(manifest_df, max_workers=args.workers)
+
+    output_file = args.output_file
+    if output_file is None:
+        # construct name of result file next to the manifest
+        date_str = datetime.datetime.now(tz=datetime.timezone.utc).strftime('%Y-%m-%d')
+        root, ext = os.path.splitext(args.file)
+        output_file = '{}_result_{}{}'.format(root, date_str, ext.lower())
+    logging.info('Writing result per project folder to "{}"'.format(output_file))
+    write_result(output_file, result_df)
+
+    for status, count in result_df.status.value_counts().items():
+        logging.info('{}: {}'.format(status, count))
+
+
+if __name__ == '__main__':
+    main()
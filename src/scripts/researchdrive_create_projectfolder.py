@@ -2,14 +2,50 @@ import logging
 from logging.handlers import TimedRotatingFileHandler
 import argparse
 import sys
-from qtpy.QtWidgets import QApplication, QMainWindow, QPushButton, QMessageBox, QHBoxLayout, QWidget, QVBoxLayout,\
-    QLineEdit, QLabel, QComboBox
-from qtpy.QtGui import QIntValidator
 import re
 import os
 import configparser
+try:
+    from .researchdrive_startup import profile_startup
+except ImportError:
+    # run as script or executable
+    from researchdrive_startup import profile_startup
+
+# profile the imports of Qt and the API client if requested (when not run as script, e.g. as console script, main
+# starts profiling)
+if __name__ == '__main__':
+    profile_startup()
+from qtpy.QtWidgets import QApplication, QMainWindow, QPushButton, QMessageBox, QHBoxLayout, QWidget, QVBoxLayout,\
+    QLineEdit, QLabel, QComboBox
+from qtpy.QtGui import QIntValidator
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
 from researchdrive import ResearchDrive
-import pandas
+from researchdrive_naming import NamingConvention
+
+
+class WorkerSignals(QObject):
+    result = Signal(object)
+    error = Signal(str)
+
+
+class Worker(QRunnable):
+    """Run a (blocking) function in a thread of a QThreadPool and emit its result to the main thread"""
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            logging.exception('Background call to {} failed'.format(self.fn.__name__))
+            self.signals.error.emit(str(e))
+            return
+        self.signals.result.emit(result)
 
 
 class MainWindow(QMainWindow):
@@ -19,20 +55,32 @@ class MainWindow(QMainWindow):
     dry_run_txt = ''
     privileges_txt = ''
     privileges = True
+    loading_txt = 'Loading...'
+    refresh_interval = 60
+    suggestions_count = 3
 
     def __init__(self, config=None):
         super().__init__()
         self.config = config
 
-        api_url = 'https://{}/dashboard/api/'.format(config['API']['environment_domain'])
+        # url may be set explicitly, e.g. to use a local stand-in of the API
+        api_url = config['API'].get('url', fallback='https://{}/dashboard/api/'.format(config['API']['environment_domain']))
         api_key  = config['API']['key']
-        self.RD_API = ResearchDrive(url=api_url, token=api_key)
-
-        self.contracts_df = self.RD_API.get_contracts()
-        if self.contracts_df.empty:
-            logging.warning('Research Drive user has no privileges to create project folders')
-            self.privileges = False
-            self.privileges_txt = '(insufficient privileges)'
+        self.RD_API = ResearchDrive(url=api_url, token=api_key, cache=True)
+        if 'snapshot_dir' in config['API']:
+            # use on-disk snapshots of the account listing to speed up startup
+            self.RD_API.snapshot_dir = config['API']['snapshot_dir']
+            self.RD_API.snapshot_max_age = float(config['API'].get('snapshot_max_age', '60'))
+
+        # API calls run in background threads, so the window is shown right away
+        self.threadpool = QThreadPool()
+        self.workers = []
+        self.contracts_df = None
+        self.me_df = None
+        self.accounts_df = None
+        self.owner_df = None
+        self.projectfolder_names = None
+        self.refreshing = False
 
         if 'dry_run' in config['API']:
             self.RD_API.dry_run = config['API']['dry_run'] == 'True'
@@ -42,6 +90,8 @@ class MainWindow(QMainWindow):
 
         if 'maxlength' in config['NAME']:
             self.maxlength = int(config['NAME']['maxlength'])
+        if 'refresh_interval' in config['NAME']:
+            self.refresh_interval = int(config['NAME']['refresh_interval'])
 
         self.setWindowTitle(config['GENERAL']['title'])
 
@@ -53,6 +103,8 @@ class MainWindow(QMainWindow):
         # NAME
         name_layout = self.create_name_layout()
         vertical_layout.addLayout(name_layout)
+        self.name_status_label = QLabel('')
+        vertical_layout.addWidget(self.name_status_label)
 
         # PROJECT_OWNER
         project_owner_layout = self.create_project_owner_layout()
@@ -76,6 +128,157 @@ class MainWindow(QMainWindow):
 
         central_widget.setLayout(vertical_layout)
 
+        # fetch contracts, current user and accounts in parallel
+        self.start_worker(self.RD_API.get_contracts, self.contracts_loaded)
+        self.start_worker(self.RD_API.get_me, self.me_loaded)
+        self.start_worker(self.RD_API.get_accounts, self.accounts_loaded)
+        # prefetch names of existing project folders and refresh them periodically
+        self.start_worker(self.fetch_projectfolder_names, self.projectfolder_names_loaded, self.projectfolder_names_failed)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_projectfolder_names)
+        self.refresh_timer.start(self.refresh_interval * 1000)
+
+    def start_worker(self, fn, result_slot, error_slot=None, *args, **kwargs):
+        """Call fn in a background thread and pass its result to result_slot in the main thread"""
+        worker = Worker(fn, *args, **kwargs)
+        worker.signals.result.connect(result_slot)
+        worker.signals.error.connect(error_slot if error_slot is not None else self.load_failed)
+        # keep a reference to the worker (and its signals) until it is done
+        self.workers.append(worker)
+        worker.signals.result.connect(lambda _: self.workers.remove(worker))
+        worker.signals.error.connect(lambda _: self.workers.remove(worker))
+        self.threadpool.start(worker)
+
+    def load_failed(self, message):
+        logging.error('Loading data from Research Drive API failed: {}'.format(message))
+        for widget in [self.project_owner_widget, self.contract_widget, self.quotum_widget]:
+            if widget.count() == 0:
+                widget.setPlaceholderText('Loading failed')
+
+    def is_loaded(self):
+        """Check whether contracts, project owners and names of existing project folders are available"""
+        return self.contracts_df is not None and self.owner_df is not None and self.projectfolder_names is not None
+
+    def fetch_projectfolder_names(self, refresh=False):
+        """Get set of names of existing project folders (runs in a background thread)"""
+        if refresh:
+            # bypass cached listing and snapshot
+            if self.RD_API.cache is not None:
+                self.RD_API.cache.invalidate('functional-account')
+            projectfolders_df = self.RD_API.get_projectfolders(max_age=0)
+        else:
+            projectfolders_df = self.RD_API.get_projectfolders()
+        return set(projectfolders_df.name.values)
+
+    def refresh_projectfolder_names(self):
+        if self.refreshing:
+            return
+        self.refreshing = True
+        self.start_worker(self.fetch_projectfolder_names, self.projectfolder_names_loaded,
+                          self.projectfolder_names_failed, refresh=True)
+
+    def projectfolder_names_loaded(self, projectfolder_names):
+        self.refreshing = False
+        self.projectfolder_names = projectfolder_names
+        self.name_changed()
+
+    def projectfolder_names_failed(self, message):
+        self.refreshing = False
+        logging.error('Loading names of existing project folders failed: {}'.format(message))
+        if self.projectfolder_names is None:
+            self.name_status_label.setText('Names of existing project folders could not be loaded')
+
+    def name_taken(self):
+        """Check whether the current project folder name already exists"""
+        return self.projectfolder_names is not None and self.projectfolder_name in self.projectfolder_names
+
+    def suggest_names(self, name):
+        """Get closest free project folder names by adding a numbered suffix"""
+        suggestions = []
+        i = 2
+        while len(suggestions) < self.suggestions_count:
+            suffix = '-{}'.format(i)
+            candidate = name[:self.maxlength - len(suffix)] + suffix
+            if candidate not in self.projectfolder_names:
+                suggestions.append(candidate)
+            i += 1
+        return suggestions
+
+    def update_name_status(self):
+        """Show whether the current project folder name is available"""
+        if not self.projectfolder_name:
+            self.name_status_label.setText('')
+        elif self.projectfolder_names is None:
+            self.name_status_label.setText('Checking existing project folders...')
+        elif self.name_taken():
+            self.name_status_label.setText('Project folder "{}" already exists; available: {}'.format(
+                self.projectfolder_name, ', '.join(self.suggest_names(self.projectfolder_name))))
+        else:
+            self.name_status_label.setText('Project folder "{}" is available'.format(self.projectfolder_name))
+
+    def contracts_loaded(self, contracts_df):
+        if contracts_df is None:
+            return self.load_failed('contracts could not be retrieved')
+        self.contracts_df = contracts_df
+        if self.contracts_df.empty:
+            logging.warning('Research Drive user has no privileges to create project folders')
+            self.privileges = False
+            self.privileges_txt = '(insufficient privileges)'
+            self.contract_widget.setPlaceholderText('No privileges')
+            self.quotum_widget.setPlaceholderText('No privileges')
+        else:
+            # add items in a loop and include the corresponding contract_id, id and quotum options as related data
+            self.contract_widget.blockSignals(True)
+            for _, row in self.contracts_df.iterrows():
+                self.contract_widget.addItem(row['contract_id'], {'contract_id': row['contract_id'],
+                                                                  'id': row['id'],
+                                                                  'quotum_option': row['quotum_option']})
+            self.contract_widget.setCurrentIndex(0)
+            self.contract_widget.blockSignals(False)
+            self.add_quotum_options()
+            self.quotum_widget.setCurrentIndex(0)
+        self.name_changed()
+
+    def me_loaded(self, me_df):
+        if me_df is None:
+            return self.load_failed('current user could not be retrieved')
+        self.me_df = me_df
+        self.owners_loaded()
+
+    def accounts_loaded(self, accounts_df):
+        if accounts_df is None:
+            return self.load_failed('accounts could not be retrieved')
+        self.accounts_df = accounts_df
+        self.owners_loaded()
+
+    def owners_loaded(self):
+        """Fill project owner combobox once both current user and accounts are available"""
+        if self.me_df is None or self.accounts_df is None:
+            return
+        me_df = self.me_df
+        accounts_df = self.accounts_df
+        project_owner_usernames = []
+        if 'items' in self.config['PROJECT_OWNER']:
+            usernames = set(accounts_df.username.values)
+            project_owner_usernames = [item for item in self.config['PROJECT_OWNER']['items'].split(',') if item in usernames]
+        if len(project_owner_usernames) == 0:
+            project_owner_usernames = me_df.username.values.tolist()
+        owner_df = accounts_df.loc[accounts_df.username.isin(project_owner_usernames), ['username', 'name']]
+        # there might be users with the same name but different usernames
+        # (e.g. an institutional as well as a private email address)
+        owner_df['is_duplicate_name'] = owner_df['name'].duplicated(keep=False)
+        # add a text column which includes the username in case of duplicate names and just the name otherwise
+        owner_df['text'] = owner_df.apply(lambda row:
+                                          f"{row['name']} ({row['username']})" if row['is_duplicate_name']
+                                          else row['name'], axis=1)
+
+        # add items in a loop and include the corresponding username as related data
+        for _, row in owner_df.iterrows():
+            self.project_owner_widget.addItem(row['text'], {'username': row['username'], 'text': row['text']})
+        self.project_owner_widget.setCurrentIndex(0)
+        self.owner_df = owner_df
+        self.name_changed()
+
     def create_name_layout(self):
         horizontal_layout = QHBoxLayout()
 
@@ -92,27 +295,10 @@ class MainWindow(QMainWindow):
     def create_project_owner_layout(self):
         horizontal_layout = QHBoxLayout()
 
-        me_df = self.RD_API.get_me()
-        accounts_df = self.RD_API.get_accounts()
-        project_owner_usernames = []
-        if 'items' in self.config['PROJECT_OWNER']:
-            project_owner_usernames = [item for item in self.config['PROJECT_OWNER']['items'].split(',') if item in accounts_df.username.values.tolist()]
-        if len(project_owner_usernames) == 0:
-            project_owner_usernames = me_df.username.values.tolist()
-        self.owner_df = accounts_df.loc[accounts_df.username.isin(project_owner_usernames), ['username', 'name']]
-        # there might be users with the same name but different usernames
-        # (e.g. an institutional as well as a private email address)
-        self.owner_df['is_duplicate_name'] = self.owner_df['name'].duplicated(keep=False)
-        # add a text column which includes the username in case of duplicate names and just the name otherwise
-        self.owner_df['text'] = self.owner_df.apply(lambda row:
-                                                    f"{row['name']} ({row['username']})" if row['is_duplicate_name']
-                                                    else row['name'], axis=1)
-
         project_owner_label = QLabel(self.config['PROJECT_OWNER']['label'])
         self.project_owner_widget = QComboBox()
-        # add items in a loop and include the corresponding username as related data
-        for _, row in self.owner_df.iterrows():
-            self.project_owner_widget.addItem(row['text'], {'username': row['username'], 'text': row['text']})
+        # items are added as soon as the accounts are loaded
+        self.project_owner_widget.setPlaceholderText(self.loading_txt)
 
         horizontal_layout.addWidget(project_owner_label)
         horizontal_layout.addWidget(self.project_owner_widget)
@@ -135,14 +321,8 @@ class MainWindow(QMainWindow):
 
         contract_label = QLabel(self.config['CONTRACT']['label'])
         self.contract_widget = QComboBox()
-        if not self.privileges:
-            self.contract_widget.setPlaceholderText('No privileges')
-        else:
-            # add items in a loop and include the corresponding contract_id, id and quotum options as related data
-            for _, row in self.contracts_df.iterrows():
-                self.contract_widget.addItem(row['contract_id'], {'contract_id': row['contract_id'],
-                                                                  'id': row['id'],
-                                                                  'quotum_option': row['quotum_option']})
+        # items are added as soon as the contracts are loaded
+        self.contract_widget.setPlaceholderText(self.loading_txt)
 
         self.contract_widget.currentTextChanged.connect(self.contract_changed)
 
@@ -166,10 +346,8 @@ class MainWindow(QMainWindow):
 
         quotum_label = QLabel(self.config['QUOTUM']['label'])
         self.quotum_widget = QComboBox()
-        if not self.privileges:
-            self.quotum_widget.setPlaceholderText('No privileges')
-        else:
-            self.add_quotum_options()
+        # items are added as soon as the contracts are loaded
+        self.quotum_widget.setPlaceholderText(self.loading_txt)
 
         horizontal_layout.addWidget(quotum_label)
         horizontal_layout.addWidget(self.quotum_widget)
@@ -191,7 +369,9 @@ class MainWindow(QMainWindow):
     def contract_changed(self):
         # Store the currently selected values of contract and quotum
         current_contract = self.contract_widget.currentData()
-        current_quotum = self.quotum_widget.currentData()['quotum']
+        current_quotum = None
+        if self.quotum_widget.currentData() is not None:
+            current_quotum = self.quotum_widget.currentData()['quotum']
 
         # Clear the existing items
         self.quotum_widget.clear()
@@ -224,7 +404,8 @@ class MainWindow(QMainWindow):
         maxlength = self.maxlength - len(self.projectfolder_name) + len(self.name_widget.text())
         self.name_widget.setMaxLength(maxlength)
         self.create_button.setText('Create projectfolder "{}" {} {}'.format(self.projectfolder_name, self.dry_run_txt, self.privileges_txt))
-        if elements_count == 1 and self.privileges:
+        self.update_name_status()
+        if elements_count == 1 and self.privileges and self.is_loaded() and not self.name_taken():
             self.create_button.setEnabled(True)
         else:
             self.create_button.setEnabled(False)
@@ -237,8 +418,8 @@ class MainWindow(QMainWindow):
         dlg = QMessageBox(self)
         dlg.setWindowTitle("Create folder?")
 
-        projectfolders_df = self.RD_API.get_projectfolders()
-        if self.projectfolder_name in projectfolders_df.name.values:
+        # names of existing project folders are prefetched and refreshed in the background
+        if self.name_taken():
             create = False
             dlg.setText('Project folder with name "{}" already exists'.format(self.projectfolder_name))
         else:
@@ -252,12 +433,30 @@ class MainWindow(QMainWindow):
 
         if button == QMessageBox.Ok:
             if create:
-                reponse = self.RD_API.create_folder(name=self.projectfolder_name,
-                                          description=self.description_widget.text().strip(),
-                                          owner={'username': owner['username']},
-                                          contract={'contract_id': contract['contract_id']},
-                                          quotum=quotum['quotum'])
-                logging.info(reponse)
+                self.create_button.setEnabled(False)
+                self.start_worker(self.RD_API.create_folder, self.folder_created, self.create_failed,
+                                  name=self.projectfolder_name,
+                                  description=self.description_widget.text().strip(),
+                                  owner={'username': owner['username']},
+                                  contract={'contract_id': contract['contract_id']},
+                                  quotum=quotum['quotum'])
+
+    def folder_created(self, reponse):
+        logging.info(reponse)
+        if reponse and not self.RD_API.dry_run:
+            self.projectfolder_names.add(self.projectfolder_name)
+            self.refresh_projectfolder_names()
+        self.name_changed()
+
+    def create_failed(self, message):
+        logging.error('Creating project folder failed: {}'.format(message))
+        self.name_changed()
+
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        # close the connection pool of the Research Drive API client
+        self.RD_API.close()
+        super().closeEvent(event)
 
 
 class MainWindowWindesheim(MainWindow):
@@ -289,6 +488,8 @@ class MainWindowWindesheim(MainWindow):
 
         self.domain_widget.addItems(domain_items)
         self.domain_widget.currentTextChanged.connect(self.name_changed)
+        # validate names with the same classifier as the overview of project folders
+        self.naming_convention = NamingConvention(domain_items)
 
         name_label = QLabel(self.config['NAME']['label'])
         self.name_widget = QLineEdit()
@@ -329,13 +530,20 @@ class MainWindowWindesheim(MainWindow):
         maxlength = self.maxlength - len(self.projectfolder_name) + len(self.name_widget.text())
         self.name_widget.setMaxLength(maxlength)
         self.create_button.setText('Create projectfolder "{}" {} {}'.format(self.projectfolder_name, self.dry_run_txt, self.privileges_txt))
-        if elements_count == 3 and self.privileges:
+        self.update_name_status()
+        name_convention = self.naming_convention.match(self.projectfolder_name)['name_convention']
+        if elements_count == 3 and not name_convention:
+            self.name_status_label.setText('Project folder name "{}" does not follow the naming convention'.format(
+                self.projectfolder_name))
+        if elements_count == 3 and name_convention and self.privileges and self.is_loaded() and not self.name_taken():
             self.create_button.setEnabled(True)
         else:
             self.create_button.setEnabled(False)
 
 
 def main():
+    # no-op if the imports are profiled already
+    profile_startup()
     logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 
     if getattr(sys, 'frozen', False):
@@ -364,6 +572,7 @@ def main():
         description='Application to create project folder in SURF Research Drive API')
     parser.add_argument('-c', '--config-file', default=default_configfile, help='Config file')
     parser.add_argument('-l', '--log-file', default=default_logfile, help='File path to log file')
+    parser.add_argument('--profile-startup', action='store_true', help='Log the time spent importing dependencies when the run ends')
     args = parser.parse_args()
 
     if args.config_file is None:
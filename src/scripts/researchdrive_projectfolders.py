@@ -7,12 +7,24 @@ import sys
 import argparse
 import os
 import datetime
-import pandas
+import csv
 import configparser
+try:
+    from .researchdrive_startup import profile_startup
+except ImportError:
+    # run as script or executable
+    from researchdrive_startup import profile_startup
+
+# pandas is imported where needed; profile the imports from here on if requested (when not run as script, e.g. as
+# console script, main starts profiling)
+if __name__ == '__main__':
+    profile_startup()
 import researchdrive
+from researchdrive_naming import NamingConvention
 
 
 def excelwriter(xlsx_file, df_report, sheet_name='Sheet1', autofit=True):
+    import pandas
     with pandas.ExcelWriter(xlsx_file, engine='xlsxwriter') as writer:
         df_report.to_excel(writer, sheet_name=sheet_name, startrow=1, header=False, index=False, na_rep='')
 
@@ -35,7 +47,66 @@ def excelwriter(xlsx_file, df_report, sheet_name='Sheet1', autofit=True):
             worksheet.autofit()
 
 
+def column_widths(df_report, max_width=100):
+    """
+    compute column widths from the maximum string length per column, instead of scanning every cell with autofit
+    :param df_report: dataframe
+    :param max_width: maximum column width in characters
+    :return: list of column widths in characters
+    """
+    widths = []
+    for column in df_report.columns:
+        lengths = df_report[column].astype(str).where(df_report[column].notna(), '').str.len()
+        # include the header and room for the filter button
+        width = max(len(str(column)), lengths.max() if len(lengths) > 0 else 0) + 3
+        widths.append(min(width, max_width))
+    return widths
+
+
+def excelwriter_constant_memory(xlsx_file, df_report, sheet_name='Sheet1', csv_file=None):
+    """
+    write large overview to xlsx file row by row in constant memory, optionally writing a csv file in the same pass;
+    tables are not supported in constant memory mode, so the header gets a filter and is frozen instead
+    :param xlsx_file: path of xlsx file
+    :param df_report: dataframe
+    :param sheet_name: name of worksheet
+    :param csv_file: path of csv file written in the same pass (optional)
+    """
+    import xlsxwriter
+
+    # native Python values, missing values written as empty cells
+    values_df = df_report.astype(object).where(df_report.notna(), None)
+    (max_row, max_col) = df_report.shape
+    header = [str(column) for column in df_report.columns]
+
+    with xlsxwriter.Workbook(xlsx_file, {'constant_memory': True}) as workbook:
+        worksheet = workbook.add_worksheet(sheet_name)
+        for i, width in enumerate(column_widths(df_report)):
+            worksheet.set_column(i, i, width)
+        worksheet.freeze_panes(1, 0)
+        worksheet.autofilter(0, 0, max_row, max_col - 1)
+        worksheet.write_row(0, 0, header, workbook.add_format({'bold': True}))
+
+        f = None
+        writer = None
+        if csv_file is not None:
+            f = open(csv_file, 'w', newline='', encoding='utf-8')
+            writer = csv.writer(f)
+            writer.writerow(header)
+        try:
+            # rows have to be written in order in constant memory mode
+            for i, row in enumerate(values_df.itertuples(index=False, name=None)):
+                worksheet.write_row(i + 1, 0, row)
+                if writer is not None:
+                    writer.writerow(row)
+        finally:
+            if f is not None:
+                f.close()
+
+
 def main():
+    # no-op if the imports are profiled already
+    profile_startup()
     logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 
     frozen = False
@@ -72,6 +143,14 @@ def main():
     parser.add_argument('-c', '--config-file', default=default_configfile, help='Config file')
     parser.add_argument('-o', '--output-dir', default=default_outputdir, help='Directory to put the resulting .xlsx file in')
     parser.add_argument('-l', '--log-file', default=default_logfile, help='File path to log file')
+    parser.add_argument('-s', '--snapshot-dir', default=None, help='Directory with on-disk snapshots of the project folder listing')
+    parser.add_argument('-m', '--max-age', default=None, type=float, help='Maximum age in minutes of a snapshot to use instead of calling the API')
+    parser.add_argument('--offline', action='store_true', help='Use the snapshot in the snapshot directory regardless of its age')
+    parser.add_argument('--constant-memory', action='store_true', help='Write the .xlsx file row by row in constant memory (for large overviews)')
+    parser.add_argument('--csv', action='store_true', help='Also write the overview to a .csv file')
+    parser.add_argument('--parquet', action='store_true', help='Also write the overview to a .parquet file (requires pyarrow)')
+    parser.add_argument('--sync', action='store_true', help='Incrementally synchronise with the local store in the snapshot directory (requires --snapshot-dir) and log changes')
+    parser.add_argument('--profile-startup', action='store_true', help='Log the time spent importing dependencies when the run ends')
     args = parser.parse_args()
 
     if args.log_file is not None:
@@ -98,15 +177,52 @@ def main():
         logging.error('Config file "{}" does not exist. EXITING...'.format(args.config_file))
         return
 
+    if args.sync and args.snapshot_dir is None:
+        # without a snapshot directory the local store is not kept between runs, so all folders would be "added"
+        logging.error('--sync requires --snapshot-dir. EXITING...')
+        return
+
     config = configparser.ConfigParser()
     config.read(args.config_file)
 
     institute = config['API']['environment_domain'].split('.')[0].lower()
-    api_url = 'https://{}/dashboard/api/'.format(config['API']['environment_domain'])
+    # url may be set explicitly, e.g. to use a local stand-in of the API
+    api_url = config['API'].get('url', fallback='https://{}/dashboard/api/'.format(config['API']['environment_domain']))
     api_key = config['API']['key']
 
-    ResearchDriveAPI = researchdrive.ResearchDrive(url=api_url, token=api_key)
-    df = ResearchDriveAPI.get_projectfolders()
+    # optional client-side limit of the number of API requests per second
+    rate_limit = config['API'].getfloat('rate_limit', fallback=None)
+
+    # selected columns; only the columns needed for the overview are retrieved from the API
+    columns = config['GENERAL']['columns'].split(',')
+    derived_columns = NamingConvention.columns if institute == 'windesheim' else []
+    api_columns = list(dict.fromkeys(['name', 'owner_name'] + [column for column in columns
+                                                               if column not in derived_columns]))
+
+    with researchdrive.ResearchDrive(url=api_url, token=api_key, snapshot_dir=args.snapshot_dir,
+                                     snapshot_max_age=args.max_age, offline=args.offline,
+                                     rate_limit=rate_limit) as ResearchDriveAPI:
+        if args.sync:
+            df, diff = ResearchDriveAPI.sync_projectfolders()
+            if df is None:
+                logging.error('Project folders could not be synchronised. EXITING...')
+                return
+            for key, diff_df in diff.items():
+                if not diff_df.empty:
+                    logging.info('Project folders {}: {}'.format(key, ','.join(diff_df.name.values.tolist())))
+            df = df[df['status.value'] == 'active']
+        else:
+            df = ResearchDriveAPI.get_projectfolders(status='active', columns=api_columns)
+    if df is None:
+        logging.error('Project folders could not be retrieved. EXITING...')
+        return
+
+    # configured columns must be fields of the project folders (or derived from the name)
+    unknown_columns = [column for column in api_columns if column not in df.columns]
+    if len(unknown_columns) > 0 and not df.empty:
+        logging.error('Unknown columns in config file: {}. EXITING...'.format(','.join(unknown_columns)))
+        return
+    df = df.reindex(columns=list(dict.fromkeys(list(df.columns) + api_columns)))
 
     output_dir = args.output_dir
     if not os.path.exists(output_dir):
@@ -114,48 +230,44 @@ def main():
 
     logging.info('Institute: {}'.format(institute))
     if institute == 'windesheim':
-        # domains are specified as comma separated list. Split and make sure they are in uppercase
-        domains = config['GENERAL']['domains'].upper().split(',')
-        mapping = {}
-        for key in config['MAPPING']:
-            mapping[key.upper()] = config['MAPPING'][key].upper().split(',')
-
-        # derive project number
-        logging.info('Adding column "project_number"')
-        # project numbers are defined as 6 digit numbers starting with nonzero
-        df['project_number'] = df.name.str.extract(r'(^[1-9]\d{5})')
-        # derive domain, being the second element of the underscore separated name
-        df['domain'] = df.name.str.extract(r'^\d{4,6}_(' + "|".join(domains) + r')_')
-        logging.info('Adding column "domain"')
-        # check compliance with name convention
-        logging.info('Adding column "name_convention"')
-        # name should start with 6 digit number, followed by underscore and domain code, followed by underscore projectname slug
-        df['name_convention'] = df.name.str.contains(r'^\d{6}_(' + r'|'.join(domains) + r')_[0-9a-zA-Z-]')
-        # apply mapping of project numbers to domains
-        for domain, project_numbers in mapping.items():
-            df.loc[df.project_number.isin(list(project_numbers)), 'domain'] = domain
-        # derive whether this concerns a test folder
-        logging.info('Adding column "test"')
-        # a projectfolder is considered as test if it does not start with a 4-6 digit number OR if both domain and project number is not available
-        df['test'] = ~df.name.str.contains(r'(^[1-9]\d{3,5})') | (pandas.isna(df.domain) & pandas.isna(df.project_number))
+        # domains and the mapping of project numbers to domains are specified in the config file
+        naming_convention = NamingConvention.from_config(config)
+
+        # derive project number, domain, compliance with name convention and whether this concerns a test folder
+        logging.info('Adding columns "project_number", "domain", "name_convention" and "test"')
+        classification_df = naming_convention.classify(df.name)
+        for column in classification_df.columns:
+            df[column] = classification_df[column]
 
         sort_columns = ['domain', 'project_number', 'owner_name']
     else:
         sort_columns = ['owner_name']
 
-    # include selected columns and show excluded columns in log
-    columns = config['GENERAL']['columns'].split(',')
-    excluded_columns = list(set(df.columns)-set(columns))
-    if len(excluded_columns) > 0:
-        logging.info('Columns excluded: {}'.format(','.join(excluded_columns)))
-    df_report = df[df['status.value'] == 'active'].sort_values(sort_columns)[columns]
+    # include selected columns
+    df_report = df.sort_values(sort_columns)[columns]
 
     # construct name of xlsx file
     date_str = datetime.datetime.now(tz=datetime.timezone.utc).strftime('%Y-%m-%d')
     xlsx_file = os.path.join(output_dir, '{}_{}_{}.xlsx'.format(os.path.splitext(os.path.basename(__file__))[0], institute, date_str))
+    csv_file = os.path.splitext(xlsx_file)[0] + '.csv' if args.csv else None
     # write table to xlsx file
     logging.info('Writing overview of projectfolders to "{}"'.format(xlsx_file))
-    excelwriter(xlsx_file, df_report, sheet_name='Sheet1', autofit=True)
+    if args.constant_memory:
+        # the csv file is written in the same pass
+        excelwriter_constant_memory(xlsx_file, df_report, sheet_name='Sheet1', csv_file=csv_file)
+    else:
+        excelwriter(xlsx_file, df_report, sheet_name='Sheet1', autofit=True)
+        if csv_file is not None:
+            df_report.to_csv(csv_file, index=False)
+    if csv_file is not None:
+        logging.info('Written overview of projectfolders to "{}"'.format(csv_file))
+    if args.parquet:
+        parquet_file = os.path.splitext(xlsx_file)[0] + '.parquet'
+        try:
+            df_report.to_parquet(parquet_file, index=False)
+            logging.info('Written overview of projectfolders to "{}"'.format(parquet_file))
+        except ImportError:
+            logging.error('pyarrow is required for the .parquet file; install with "pip install -e .[snapshot]"')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -4,74 +4,97 @@ import sys
 import argparse
 import os
 import datetime
-import pandas
+import time
+import json
+import hashlib
+import shutil
+import gzip
+import base64
+import html
+import string
+import multiprocessing
 import glob
-from qtpy.QtWidgets import QApplication, QMainWindow, QPushButton, QMessageBox, QWidget, QVBoxLayout, QLabel, QFileDialog
+try:
+    from .researchdrive_startup import profile_startup
+except ImportError:
+    # run as script or executable
+    from researchdrive_startup import profile_startup
 
+# pandas, numpy, pyarrow and Qt are imported where needed, so each mode only loads the dependencies it uses
 
-class MainWindow(QMainWindow):
-    input_dir = '../..'
 
-    def __init__(self, input_dir='.'):
-        super().__init__()
+def create_main_window(input_dir='.'):
+    """
+    create the window of the GUI; Qt is only imported here, so the command line modes start without it
+    :param input_dir: directory to select the source file from
+    :return: MainWindow (create the QApplication first)
+    """
+    from qtpy.QtWidgets import QMainWindow, QPushButton, QWidget, QVBoxLayout, QLabel, QFileDialog
 
-        self.input_dir = input_dir
+    class MainWindow(QMainWindow):
+        input_dir = '../..'
 
-        self.setWindowTitle('Research Drive reporting')
+        def __init__(self, input_dir='.'):
+            super().__init__()
 
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
+            self.input_dir = input_dir
 
-        vertical_layout = QVBoxLayout()
+            self.setWindowTitle('Research Drive reporting')
 
-        self.selectfile_button = QPushButton('Select .xlsx reporting file')
-        self.selectfile_button.clicked.connect(self.selectfile)
+            central_widget = QWidget()
+            self.setCentralWidget(central_widget)
 
-        self.selectfile_label = QLabel('')
+            vertical_layout = QVBoxLayout()
 
-        vertical_layout.addWidget(self.selectfile_button)
-        vertical_layout.addWidget(self.selectfile_label)
+            self.selectfile_button = QPushButton('Select .xlsx reporting file')
+            self.selectfile_button.clicked.connect(self.selectfile)
 
-        self.selectdir_button = QPushButton('Select directory for resulting .html files')
-        self.selectdir_button.clicked.connect(self.selectdir)
+            self.selectfile_label = QLabel('')
 
-        self.selectdir_label = QLabel('')
+            vertical_layout.addWidget(self.selectfile_button)
+            vertical_layout.addWidget(self.selectfile_label)
 
-        vertical_layout.addWidget(self.selectdir_button)
-        vertical_layout.addWidget(self.selectdir_label)
+            self.selectdir_button = QPushButton('Select directory for resulting .html files')
+            self.selectdir_button.clicked.connect(self.selectdir)
 
-        self.button = QPushButton('Process reporting')
-        self.button.clicked.connect(self.process_reporting)
+            self.selectdir_label = QLabel('')
 
-        vertical_layout.addWidget(self.button)
+            vertical_layout.addWidget(self.selectdir_button)
+            vertical_layout.addWidget(self.selectdir_label)
 
-        central_widget.setLayout(vertical_layout)
+            self.button = QPushButton('Process reporting')
+            self.button.clicked.connect(self.process_reporting)
 
-    def selectfile(self):
-        fname = QFileDialog.getOpenFileName(self, 'Select file',
-                                            self.input_dir, "Excel files (*.xlsx)")
-        xlsx_file = fname[0]
-        self.selectfile_label.setText(xlsx_file)
+            vertical_layout.addWidget(self.button)
 
-        # derive input directory
-        self.input_dir = os.path.abspath(os.path.dirname(xlsx_file))
+            central_widget.setLayout(vertical_layout)
 
-        date_str = datetime.datetime.fromtimestamp(os.path.getmtime(xlsx_file), tz=datetime.timezone.utc).strftime(
-            '%Y-%m-%d')
+        def selectfile(self):
+            fname = QFileDialog.getOpenFileName(self, 'Select file',
+                                                self.input_dir, "Reporting files (*.xlsx *.csv *.feather)")
+            xlsx_file = fname[0]
+            self.selectfile_label.setText(xlsx_file)
 
-        output_dir = self.selectdir_label.text()
+            # derive input directory
+            self.input_dir = os.path.abspath(os.path.dirname(xlsx_file))
 
-        if output_dir == '':
-            output_dir = os.path.join(self.input_dir, 'researchdrive_reporting_{}'.format(date_str))
-            self.selectdir_label.setText(output_dir)
+            date_str = export_date(xlsx_file)
 
-    def selectdir(self):
-        dirname = QFileDialog.getExistingDirectory(self, 'Select directory', self.input_dir, QFileDialog.ShowDirsOnly)
-        if dirname != '':
-            self.selectdir_label.setText(dirname)
+            output_dir = self.selectdir_label.text()
 
-    def process_reporting(self):
-        create_html_files(xlsx_file=self.selectfile_label.text(), output_dir=self.selectdir_label.text())
+            if output_dir == '':
+                output_dir = os.path.join(self.input_dir, 'researchdrive_reporting_{}'.format(date_str))
+                self.selectdir_label.setText(output_dir)
+
+        def selectdir(self):
+            dirname = QFileDialog.getExistingDirectory(self, 'Select directory', self.input_dir, QFileDialog.ShowDirsOnly)
+            if dirname != '':
+                self.selectdir_label.setText(dirname)
+
+        def process_reporting(self):
+            create_html_files(xlsx_file=self.selectfile_label.text(), output_dir=self.selectdir_label.text())
+
+    return MainWindow(input_dir=input_dir)
 
 
 def get_most_recent_file(pattern):
@@ -85,23 +108,387 @@ def get_most_recent_file(pattern):
     return most_recent_file
 
 
-def create_html_files(xlsx_file, output_dir):
-    # check if file exists
-    if not os.path.exists(xlsx_file):
-        logging.error('"{}" does not exist.'.format(xlsx_file))
-        return
-
-    # check if file extension is .xslx
-    ext = os.path.splitext(xlsx_file)[-1]
-    if not ext.lower() == '.xlsx':
-        logging.error('Extension "{}" is not supported.'.format(xlsx_file))
+# columns of the SURF Reporting sharing export used for the autorisation overview
+EXPORT_COLUMNS = ['Project', 'shared_path', 'Permissions', 'Shared as', 'Recipient', 'Recipient displayname']
+# columns of the export with few distinct values, read as categorical
+CATEGORICAL_COLUMNS = ['Project', 'Permissions', 'Shared as']
+# columns of the structured autorisation overview, in order of grouping
+REPORT_COLUMNS = ['level', 'shared_path', 'Permissions', 'Shared as', 'Group displayname', 'Domain']
+# manifest with content hash and html file per project folder, stored in the output directory
+MANIFEST_FILE = 'researchdrive_report_manifest.json'
+# columns identifying a grant when comparing two exports
+GRANT_KEY = ['shared_path', 'Recipient']
+# columns of a grant of which a change is reported when comparing two exports
+GRANT_COLUMNS = ['Permissions', 'Shared as', 'Group displayname']
+# kinds of changes of grants, in order of reporting
+CHANGES = ['added', 'removed', 'changed']
+# schema metadata of the columnar intermediate with the date of the source export
+DATE_METADATA_KEY = b'researchdrive.export_date'
+# single-file report with an index of the projects; the table of a project is stored as gzip compressed, base64
+# encoded json and rendered when the project is selected
+REPORT_TEMPLATE = string.Template('''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body { font-family: sans-serif; font-size: 13px; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #ccc; padding: 2px 6px; text-align: left; vertical-align: top; }
+#index tbody tr { cursor: pointer; }
+#index tbody tr:hover, #index tbody tr.selected { background: #e8f0fe; }
+#index td.count { text-align: right; }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+<p><input id="filter" type="search" placeholder="Filter project folders"></p>
+<table id="index">
+<thead><tr><th>Project folder</th><th>Grants</th><th>External domains</th><th>Federated shares</th></tr></thead>
+<tbody>
+$index_rows
+</tbody>
+</table>
+<h2 id="project"></h2>
+<div id="report"></div>
+<script id="data" type="application/json">$data</script>
+<script>
+const data = JSON.parse(document.getElementById('data').textContent);
+
+async function decompress(encoded) {
+  const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+  return await new Response(stream).json();
+}
+
+function render(table) {
+  const element = document.createElement('table');
+  const header = element.createTHead().insertRow();
+  for (const column of table.columns) {
+    const th = document.createElement('th');
+    th.textContent = column;
+    header.appendChild(th);
+  }
+  const body = element.createTBody();
+  const nIndex = table.columns.length - 1;
+  let previous = [];
+  for (const row of table.data) {
+    const tr = body.insertRow();
+    // leave repeated values of the leading columns out, like the per-project html files
+    let same = true;
+    row.forEach((value, i) => {
+      same = same && i < nIndex - 1 && value === previous[i];
+      const cell = tr.insertCell();
+      cell.textContent = same || value === null ? '' : value;
+    });
+    previous = row;
+  }
+  return element;
+}
+
+async function show(tr) {
+  document.querySelectorAll('#index tr.selected').forEach(r => r.classList.remove('selected'));
+  tr.classList.add('selected');
+  const name = tr.dataset.project;
+  document.getElementById('project').textContent = name;
+  document.getElementById('report').replaceChildren(render(await decompress(data[name])));
+}
+
+document.querySelectorAll('#index tbody tr').forEach(tr => tr.addEventListener('click', () => show(tr)));
+document.getElementById('filter').addEventListener('input', event => {
+  const text = event.target.value.toLowerCase();
+  document.querySelectorAll('#index tbody tr').forEach(tr => {
+    tr.style.display = tr.dataset.project.toLowerCase().includes(text) ? '' : 'none';
+  });
+});
+</script>
+</body>
+</html>
+''')
+
+
+def read_xlsx(file, engine=None):
+    """
+    read SURF Reporting .xlsx export, using the fast calamine engine if available
+    :param file: .xlsx file
+    :param engine: pandas.read_excel engine ("calamine" or "openpyxl"; default: calamine if installed)
+    :return: dataframe with the columns of the export used for the autorisation overview
+    """
+    import pandas
+    engines = [engine] if engine is not None else ['calamine', 'openpyxl']
+    for engine in engines:
+        try:
+            return pandas.read_excel(file, header=1, usecols=EXPORT_COLUMNS, engine=engine)
+        except (ImportError, ValueError) as e:
+            if engine == engines[-1]:
+                raise
+            # engine not installed or not supported by this version of pandas
+            logging.debug('Engine "{}" not available ({}); trying next engine'.format(engine, e))
+
+
+def read_csv(file, engine=None):
+    """
+    read SURF Reporting export saved as .csv, with or without the title row above the header
+    :param file: .csv file
+    :param engine: not used
+    :return: dataframe with the columns of the export used for the autorisation overview
+    """
+    import pandas
+    header = 0
+    if 'Project' not in pandas.read_csv(file, nrows=0).columns:
+        header = 1
+    return pandas.read_csv(file, header=header, usecols=EXPORT_COLUMNS,
+                           dtype={column: 'category' for column in CATEGORICAL_COLUMNS})
+
+
+def read_feather(file, engine=None):
+    """
+    read columnar intermediate of a SURF Reporting export (see convert_export), memory-mapped
+    :param file: .feather file
+    :param engine: not used
+    :return: normalized dataframe (see normalize_report; None if pyarrow is not installed)
+    """
+    try:
+        import pyarrow.feather
+    except ImportError:
+        logging.error(PYARROW_REQUIRED.format(file))
+        return None
+    return pyarrow.feather.read_table(file, memory_map=True).to_pandas()
+
+
+# reader per file extension
+READERS = {'.xlsx': read_xlsx,
+           '.csv': read_csv,
+           '.feather': read_feather}
+
+PYARROW_REQUIRED = 'pyarrow is required to read "{}"; install with "pip install -e .[columnar]"'
+
+
+def check_export(file):
+    """
+    check whether SURF Reporting export exists and can be read
+    :param file: export file (.xlsx, .csv or .feather)
+    :return: True if the export can be read (an error is logged otherwise)
+    """
+    if not os.path.exists(file):
+        logging.error('"{}" does not exist.'.format(file))
+        return False
+    ext = os.path.splitext(file)[-1].lower()
+    if ext not in READERS:
+        logging.error('Extension "{}" is not supported.'.format(file))
+        return False
+    if ext == '.feather':
+        try:
+            import pyarrow
+        except ImportError:
+            logging.error(PYARROW_REQUIRED.format(file))
+            return False
+    return True
+
+
+def read_export(file, engine=None):
+    """
+    read SURF Reporting sharing export with the reader for its file extension
+    :param file: export file (.xlsx or .csv)
+    :param engine: engine for .xlsx files ("calamine" or "openpyxl"; default: calamine if installed)
+    :return: dataframe with the columns of the export used for the autorisation overview (None if not supported)
+    """
+    ext = os.path.splitext(file)[-1].lower()
+    if ext not in READERS:
+        logging.error('Extension "{}" is not supported.'.format(file))
+        return None
+    df = READERS[ext](file, engine=engine)
+    if df is None:
+        return None
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].astype('category')
+    return df
+
+
+def export_date(file):
+    """
+    get date of SURF Reporting export, stored in the columnar intermediate or derived from the modification time
+    :param file: export file (.xlsx, .csv or .feather)
+    :return: date string (yyyy-mm-dd)
+    """
+    if os.path.splitext(file)[-1].lower() == '.feather':
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            # not readable either, see check_export; fall back to the modification time
+            logging.error(PYARROW_REQUIRED.format(file))
+        else:
+            # read the schema only
+            with pyarrow.memory_map(file) as source:
+                metadata = pyarrow.ipc.open_file(source).schema.metadata or {}
+            if DATE_METADATA_KEY in metadata:
+                return metadata[DATE_METADATA_KEY].decode()
+    return datetime.datetime.fromtimestamp(os.path.getmtime(file), tz=datetime.timezone.utc).strftime('%Y-%m-%d')
+
+
+def map_categories(series, fn):
+    """
+    apply function to the distinct values of a series only
+    :param series: (categorical) series
+    :param fn: function applied to each distinct (non missing) value
+    :return: categorical series with sorted categories
+    """
+    import numpy
+    import pandas
+    categorical = series.astype('category')
+    # append missing value for code -1
+    values = numpy.append(numpy.asarray(categorical.cat.categories.map(fn), dtype=object), numpy.nan)
+    return pandas.Series(values[categorical.cat.codes.values], index=series.index).astype('category')
+
+
+def normalize_report(df):
+    """
+    derive columns for the autorisation overview from the SURF Reporting sharing export
+    :param df: dataframe with sharing export
+    :return: dataframe with columns level, Group displayname and Domain added and Shared as normalized
+    """
+    if 'Group displayname' in df.columns:
+        # already normalized (columnar intermediate)
+        return df
+    # introduce level (0: project folder; 1: first level sub folder)
+    df['level'] = df.shared_path.str.count('/') - 1
+    # create column with group name
+    group_displayname = lambda s: '' if s.replace('customgroup_', '') in ['individual', 'federated_share'] \
+        else s.replace('customgroup_', '')
+    df['Group displayname'] = map_categories(df['Shared as'], group_displayname)
+    # replace suffix of custom groups
+    df['Shared as'] = map_categories(df['Shared as'], lambda s: 'group' if s.startswith('customgroup_') else s)
+    # display federated ID as "Recipient displayname"
+    idx = df['Shared as'] == 'federated_share'
+    df.loc[idx, 'Recipient displayname'] = df[idx]['Recipient']
+    # introduce domain column, displaying the domain of the Recipient
+    df['Domain'] = df['Recipient'].str.split('@').str[1].fillna('')
+    return df
+
+
+def get_project_folders(df):
+    """
+    get name of project folder per project, derived from the shared path at level 0 of each project
+    :param df: normalized dataframe (see normalize_report)
+    :return: dictionary with project: project folder name
+    """
+    level0_df = df.loc[df.level == 0].drop_duplicates('Project')
+    return dict(zip(level0_df.Project,
+                    level0_df.shared_path.str.replace('/', '').str.replace(' (Projectfolder)', '')))
+
+
+def iter_project_reports(df):
+    """
+    generator of structured autorisation overviews per project, built from a single sort of all rows
+    :param df: normalized dataframe (see normalize_report)
+    :return: generator of tuples with project folder name and autorisation overview dataframe
+    """
+    import pandas
+    project_folders = get_project_folders(df)
+
+    # sort once by project and overview columns; the stable sort keeps the original order within each group and rows
+    # with missing values in the overview columns are left out, like in a groupby
+    sorted_df = df.dropna(subset=REPORT_COLUMNS).sort_values(['Project'] + REPORT_COLUMNS, kind='mergesort')
+    index = pandas.MultiIndex.from_arrays([sorted_df[column] for column in REPORT_COLUMNS] + [sorted_df.index],
+                                          names=REPORT_COLUMNS + [None])
+    report_df = pandas.DataFrame({'Recipient displayname': sorted_df['Recipient displayname'].values}, index=index)
+    positions = sorted_df.groupby('Project', sort=False, observed=True).indices
+
+    for project in pandas.unique(df.Project.dropna()):
+        if project not in project_folders:
+            logging.warning('No project folder found for project "{}"'.format(project))
+            continue
+        yield project_folders[project], report_df.iloc[positions.get(project, [])]
+
+
+def write_html_file(html_file, df_report):
+    """
+    write autorisation overview of a project to html file
+    :param html_file: path of html file
+    :param df_report: autorisation overview dataframe
+    :return: path of html file
+    """
+    df_report.to_html(html_file, encoding="utf-8")
+    return html_file
+
+
+def report_hash(df_report):
+    """
+    compute content hash of the permission rows of a project, including the row numbers in the export (rendered in
+    the html file)
+    :param df_report: autorisation overview dataframe
+    :return: hexadecimal hash string
+    """
+    import pandas
+    # hash the rows as rendered, so the hash does not depend on the dtypes given by the reader of the export
+    rows_df = df_report.reset_index().astype(str)
+    return hashlib.sha1(pandas.util.hash_pandas_object(rows_df, index=False).values.tobytes()).hexdigest()
+
+
+def read_manifest(directory):
+    """
+    read manifest with content hash and html file per project folder
+    :param directory: directory containing the manifest
+    :return: dictionary with project folder: {"hash": ..., "file": ...} (empty if no manifest is available)
+    """
+    manifest_file = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(directory, manifest):
+    """
+    write manifest with content hash and html file per project folder
+    :param directory: directory to store the manifest in
+    :param manifest: dictionary with project folder: {"hash": ..., "file": ...}
+    """
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def carry_forward(previous_file, html_file):
+    """
+    reuse html file of a previous run by hardlink (or copy if linking is not possible)
+    :param previous_file: path of previous html file
+    :param html_file: path of new html file
+    :return: True if the new html file is available
+    """
+    if not os.path.exists(previous_file):
+        return False
+    if os.path.abspath(previous_file) == os.path.abspath(html_file):
+        return True
+    if os.path.exists(html_file):
+        os.remove(html_file)
+    try:
+        os.link(previous_file, html_file)
+    except OSError:
+        shutil.copy2(previous_file, html_file)
+    return True
+
+
+def create_html_files(xlsx_file, output_dir, workers=1, engine=None, incremental=False, previous_dir=None):
+    """
+    create html file with autorisation overview per project from SURF Reporting .xlsx file
+    :param xlsx_file: SURF Reporting export (.xlsx or .csv)
+    :param output_dir: directory to put the resulting .html files in
+    :param workers: number of processes writing html files concurrently (1: write in this process)
+    :param engine: engine for reading .xlsx files ("calamine" or "openpyxl"; default: calamine if installed)
+    :param incremental: if True, only render projects of which the permission rows changed since the previous run
+        and carry forward the html files of the other projects
+    :param previous_dir: directory with manifest and html files of the previous run (defaults to output_dir)
+    :return: list of project folders that are (re)rendered
+    """
+    # check if file exists and its file extension is supported
+    if not check_export(xlsx_file):
         return
 
     # derive input directory
     input_dir = os.path.abspath(os.path.dirname(xlsx_file))
 
-    date_str = datetime.datetime.fromtimestamp(os.path.getmtime(xlsx_file), tz=datetime.timezone.utc).strftime(
-        '%Y-%m-%d')
+    date_str = export_date(xlsx_file)
 
     if output_dir is None:
         output_dir = os.path.join(input_dir, 'researchdrive_reporting_{}'.format(date_str))
@@ -109,38 +496,353 @@ def create_html_files(xlsx_file, output_dir):
     if not os.path.exists(output_dir):
         os.mkdir(output_dir)
 
-    df = pandas.read_excel(xlsx_file, header=1)
-    # introduce level (0: project folder; 1: first level sub folder)
-    df['level'] = df.shared_path.str.count('/') - 1
-    # create column with group name
-    df['Group displayname'] = df['Shared as'].str.replace('customgroup_', '')
-    df.loc[df['Group displayname'].isin(['individual', 'federated_share']), 'Group displayname'] = ''
-    # replace suffix of custom groups
-    df.loc[df['Shared as'].str.startswith('customgroup_'), 'Shared as'] = 'group'
-    # display federated ID as "Recipient displayname"
-    idx = df['Shared as'] == 'federated_share'
-    df.loc[idx, 'Recipient displayname'] = df[idx]['Recipient']
-    # introduce domain column, displaying the domain of the Recipient
-    df['Domain'] = df['Recipient'].apply(lambda s: s.split('@')[1] if '@' in s else '')
-
-    for project in pandas.unique(df.Project):
-        project_idx = df.Project==project
-        # get name of project folder
-        project_folder = df[(project_idx) & (df.level == 0)]['shared_path'].values[0].replace('/', '').replace(
-            ' (Projectfolder)', '')
+    if previous_dir is None:
+        previous_dir = output_dir
+    previous_manifest = read_manifest(previous_dir) if incremental else {}
+    if incremental and len(previous_manifest) == 0:
+        logging.info('No manifest of a previous run found in "{}"; rendering all projects'.format(previous_dir))
 
-        # create structured autorisation overview
-        df_report = \
-        df[project_idx].groupby(['level', 'shared_path', 'Permissions', 'Shared as', 'Group displayname', 'Domain'],
-                                          group_keys=True)['Recipient displayname'].apply(lambda x: x).to_frame()
+    t0 = time.perf_counter()
+    df = normalize_report(read_export(xlsx_file, engine=engine))
+    t1 = time.perf_counter()
 
-        # define full path of html file
+    manifest = {}
+    reports = []
+    changed = []
+    for project_folder, df_report in iter_project_reports(df):
         html_file = os.path.join(output_dir, '{}_{}.html'.format(project_folder, date_str))
-        # write to html file
-        logging.info('Writing {}'.format(html_file))
-        df_report.to_html(html_file, encoding="utf-8")
+        if incremental:
+            content_hash = report_hash(df_report)
+            manifest[project_folder] = {'hash': content_hash, 'file': os.path.basename(html_file)}
+
+            previous = previous_manifest.get(project_folder)
+            if previous is not None and previous['hash'] == content_hash and \
+                    carry_forward(os.path.join(previous_dir, previous['file']), html_file):
+                continue
+        changed.append(project_folder)
+        reports.append((html_file, df_report))
+    t2 = time.perf_counter()
+
+    if incremental:
+        logging.info('{} unchanged projects carried forward'.format(len(manifest) - len(changed)))
+        logging.info('{} changed projects: {}'.format(len(changed), ', '.join(changed)))
+        removed = sorted(set(previous_manifest) - set(manifest))
+        if len(removed) > 0:
+            logging.info('{} projects no longer in export: {}'.format(len(removed), ', '.join(removed)))
+
+    if workers is None or workers <= 1:
+        for html_file, df_report in reports:
+            # write to html file
+            logging.info('Writing {}'.format(html_file))
+            write_html_file(html_file, df_report)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        logging.info('Writing {} html files using {} processes'.format(len(reports), workers))
+        # send projects to the processes in chunks to limit the overhead of passing them
+        chunksize = max(1, len(reports) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            html_files = executor.map(write_html_file,
+                                      [html_file for html_file, _ in reports],
+                                      [df_report for _, df_report in reports],
+                                      chunksize=chunksize)
+            for i, html_file in enumerate(html_files):
+                logging.info('Written {} ({}/{})'.format(html_file, i + 1, len(reports)))
+    if incremental:
+        write_manifest(output_dir, manifest)
+    t3 = time.perf_counter()
+
+    logging.info('Created {} html files in {:.1f} s (reading: {:.1f} s; grouping: {:.1f} s; writing: {:.1f} s)'.format(
+        len(reports), t3 - t0, t1 - t0, t2 - t1, t3 - t2))
+
+    return changed
+
+def get_internal_domains(df):
+    """
+    get the most common domain of the recipients of an export, assumed to be the domain of the own institution
+    :param df: normalized dataframe (see normalize_report)
+    :return: list of domains (empty if no recipient has a domain)
+    """
+    domains = df.Domain[df.Domain != '']
+    if len(domains) == 0:
+        return []
+    return [domains.value_counts().index[0]]
+
+
+def encode_report(df_report):
+    """
+    encode autorisation overview of a project as gzip compressed, base64 encoded json
+    :param df_report: autorisation overview dataframe
+    :return: ascii string with json object with "columns" and "data" (rows)
+    """
+    rows_df = df_report.reset_index()
+    # unnamed level with the row numbers in the export gets an empty header, like in the per-project html files
+    names = list(df_report.index.names) + list(df_report.columns)
+    rows_df.columns = [name if name is not None else '' for name in names]
+    rows_json = rows_df.to_json(orient='split', index=False)
+    return base64.b64encode(gzip.compress(rows_json.encode('utf-8'), mtime=0)).decode('ascii')
+
+
+def create_html_report(xlsx_file, output_dir=None, engine=None, internal_domains=None):
+    """
+    create single html file with an index of the projects and the autorisation overview per project, loaded when
+    the project is selected
+    :param xlsx_file: SURF Reporting export (.xlsx, .csv or .feather)
+    :param output_dir: directory to put the resulting .html file in (defaults to the directory of the export)
+    :param engine: engine for reading .xlsx files ("calamine" or "openpyxl"; default: calamine if installed)
+    :param internal_domains: domains of the own institution; recipients of other domains are counted as external
+        (defaults to the most common domain of the export)
+    :return: path of html file
+    """
+    import pandas
+    if not check_export(xlsx_file):
+        return
+
+    date_str = export_date(xlsx_file)
+
+    if output_dir is None:
+        output_dir = os.path.abspath(os.path.dirname(xlsx_file))
+
+    if not os.path.exists(output_dir):
+        os.mkdir(output_dir)
+
+    html_file = os.path.join(output_dir, 'researchdrive_reporting_{}.html'.format(date_str))
+
+    t0 = time.perf_counter()
+    df = normalize_report(read_export(xlsx_file, engine=engine))
+    t1 = time.perf_counter()
+
+    if internal_domains is None:
+        internal_domains = get_internal_domains(df)
+    logging.info('Internal domains: {}'.format(', '.join(internal_domains)))
+
+    index_rows = []
+    data = {}
+    for project_folder, df_report in sorted(iter_project_reports(df), key=lambda item: item[0]):
+        domains = df_report.index.get_level_values('Domain')
+        shared_as = df_report.index.get_level_values('Shared as')
+        external_domains = pandas.unique(domains[(domains != '') & ~domains.isin(internal_domains)])
+        index_rows.append('<tr data-project="{0}"><td>{0}</td><td class="count">{1}</td><td class="count">{2}</td>'
+                          '<td class="count">{3}</td></tr>'.format(html.escape(project_folder), len(df_report),
+                                                                    len(external_domains),
+                                                                    (shared_as == 'federated_share').sum()))
+        data[project_folder] = encode_report(df_report)
+    t2 = time.perf_counter()
+
+    logging.info('Writing {}'.format(html_file))
+    with open(html_file, 'w', encoding='utf-8') as f:
+        # the keys are project folder names, which may contain e.g. "</script>"; escape "<", ">" and "&" in the
+        # json (as unicode escapes, which JSON.parse decodes), so the data cannot end the script element
+        data_json = json.dumps(data).replace('<', '\\u003c').replace('>', '\\u003e').replace('&', '\\u0026')
+        f.write(REPORT_TEMPLATE.substitute(title=html.escape('Research Drive autorisation overview {}'.format(date_str)),
+                                           index_rows='\n'.join(index_rows),
+                                           data=data_json))
+    t3 = time.perf_counter()
+
+    logging.info('Created report of {} projects ({:.1f} MB) in {:.1f} s (reading: {:.1f} s; grouping: {:.1f} s; '
+                 'writing: {:.1f} s)'.format(len(data), os.path.getsize(html_file) / 1e6, t3 - t0, t1 - t0, t2 - t1,
+                                             t3 - t2))
+
+    return html_file
+
+
+def get_grants(df):
+    """
+    get grants of a normalized export, one row per shared path and recipient
+    :param df: normalized dataframe (see normalize_report)
+    :return: dataframe with project folder, grant key, grant columns and Recipient displayname and Domain
+    """
+    import pandas
+    df = df.dropna(subset=['shared_path'])
+    project_folders = get_project_folders(df)
+    grants_df = pandas.DataFrame({'Project folder': df.Project.map(project_folders).astype(object)})
+    # compare values as text, exports read by different readers may have different dtypes
+    for column in GRANT_KEY + GRANT_COLUMNS + ['Recipient displayname', 'Domain']:
+        grants_df[column] = df[column].astype(object).where(df[column].notna(), '').astype(str)
+
+    duplicated = grants_df.duplicated(subset=GRANT_KEY, keep=False).values
+    if duplicated.any():
+        # a path can be shared with a recipient more than once (e.g. directly and via a group); combine the
+        # distinct values of the grant columns, so a change in any of the shares is compared
+        aggregate = {column: 'first' for column in grants_df.columns if column not in GRANT_KEY}
+        aggregate.update({column: join_grant_values for column in GRANT_COLUMNS})
+        combined_df = grants_df.loc[duplicated].groupby(GRANT_KEY, sort=False, as_index=False).agg(aggregate)
+        grants_df = pandas.concat([grants_df.loc[~duplicated], combined_df[grants_df.columns]], ignore_index=True)
+    return grants_df
+
+
+def join_grant_values(values):
+    """
+    combine values of a grant column of grants with the same shared path and recipient
+    :param values: series with values as text
+    :return: sorted distinct non-empty values, separated by "; "
+    """
+    return '; '.join(sorted(set(values) - {''}))
+
+
+def compare_exports(old_df, new_df):
+    """
+    compare grants of two normalized exports, joined on shared path and recipient
+    :param old_df: normalized dataframe of the older export (see normalize_report)
+    :param new_df: normalized dataframe of the newer export (see normalize_report)
+    :return: dataframe with one row per added, removed or changed grant, sorted by project folder and shared path
+    """
+    import numpy
+    import pandas
+    merged_df = pandas.merge(get_grants(old_df), get_grants(new_df), how='outer', on=GRANT_KEY,
+                             suffixes=(' (old)', ' (new)'), indicator=True)
+    changed = numpy.zeros(len(merged_df), dtype=bool)
+    for column in GRANT_COLUMNS:
+        changed |= (merged_df[column + ' (old)'] != merged_df[column + ' (new)']).values
+    change = numpy.select([merged_df._merge.values == 'right_only',
+                           merged_df._merge.values == 'left_only',
+                           changed],
+                          CHANGES, default='')
+
+    diff_df = pandas.DataFrame({'Project folder': merged_df['Project folder (new)'].fillna(
+                                    merged_df['Project folder (old)']),
+                                'Change': change})
+    for column in GRANT_KEY:
+        diff_df[column] = merged_df[column]
+    for column in ['Recipient displayname', 'Domain']:
+        diff_df[column] = merged_df[column + ' (new)'].fillna(merged_df[column + ' (old)'])
+    for column in GRANT_COLUMNS:
+        diff_df[column + ' (old)'] = merged_df[column + ' (old)']
+        diff_df[column + ' (new)'] = merged_df[column + ' (new)']
+
+    diff_df = diff_df.loc[diff_df.Change != '']
+    diff_df['Change'] = pandas.Categorical(diff_df.Change, categories=CHANGES)
+    return diff_df.sort_values(['Project folder', 'shared_path', 'Recipient', 'Change'], kind='mergesort',
+                               na_position='first').reset_index(drop=True)
+
+
+def summarize_changes(diff_df):
+    """
+    count added, removed and changed grants per project folder
+    :param diff_df: dataframe with changed grants (see compare_exports)
+    :return: dataframe with the number of grants per project folder (rows) and kind of change (columns)
+    """
+    import pandas
+    summary_df = pandas.crosstab(diff_df['Project folder'].fillna(''), diff_df.Change, dropna=False)
+    summary_df = summary_df.reindex(columns=CHANGES, fill_value=0)
+    summary_df.columns = list(summary_df.columns)
+    summary_df['total'] = summary_df.sum(axis=1)
+    return summary_df
+
+
+def write_diff_file(diff_file, diff_df, summary_df, title=''):
+    """
+    write summary and details of changed grants to .html or .xlsx file
+    :param diff_file: path of .html or .xlsx file
+    :param diff_df: dataframe with changed grants (see compare_exports)
+    :param summary_df: dataframe with the number of changed grants per project folder (see summarize_changes)
+    :param title: title of the comparison
+    :return: path of diff file
+    """
+    import pandas
+    if os.path.splitext(diff_file)[-1].lower() == '.xlsx':
+        with pandas.ExcelWriter(diff_file) as writer:
+            summary_df.to_excel(writer, sheet_name='Summary')
+            diff_df.to_excel(writer, sheet_name='Changes', index=False)
+    else:
+        with open(diff_file, 'w', encoding='utf-8') as f:
+            f.write('<html>\n<head><meta charset="utf-8"><title>{0}</title></head>\n<body>\n<h1>{0}</h1>\n'.format(
+                html.escape(title)))
+            f.write('<h2>Summary</h2>\n')
+            f.write(summary_df.to_html())
+            f.write('\n<h2>Changes</h2>\n')
+            f.write(diff_df.to_html(index=False))
+            f.write('\n</body>\n</html>\n')
+    return diff_file
+
+
+def create_diff_file(old_file, new_file, diff_file=None, engine=None):
+    """
+    create summary of added, removed and changed grants between two SURF Reporting exports
+    :param old_file: older SURF Reporting export (.xlsx or .csv)
+    :param new_file: newer SURF Reporting export (.xlsx or .csv)
+    :param diff_file: resulting .html or .xlsx file (defaults to a .html file next to the newer export)
+    :param engine: engine for reading .xlsx files ("calamine" or "openpyxl"; default: calamine if installed)
+    :return: path of diff file
+    """
+    for file in [old_file, new_file]:
+        if not check_export(file):
+            return
+
+    old_date_str, new_date_str = export_date(old_file), export_date(new_file)
+
+    if diff_file is None:
+        diff_file = os.path.join(os.path.abspath(os.path.dirname(new_file)),
+                                 'researchdrive_reporting_diff_{}_{}.html'.format(old_date_str, new_date_str))
+
+    t0 = time.perf_counter()
+    old_df = normalize_report(read_export(old_file, engine=engine))
+    new_df = normalize_report(read_export(new_file, engine=engine))
+    t1 = time.perf_counter()
+    diff_df = compare_exports(old_df, new_df)
+    summary_df = summarize_changes(diff_df)
+    t2 = time.perf_counter()
+
+    logging.info('Writing {}'.format(diff_file))
+    title = 'Changes in Research Drive permissions from {} to {}'.format(old_date_str, new_date_str)
+    write_diff_file(diff_file, diff_df, summary_df, title=title)
+    t3 = time.perf_counter()
+
+    for change in CHANGES:
+        logging.info('{} grants: {}'.format(change, summary_df[change].sum()))
+    logging.info('Compared {} and {} rows in {:.1f} s (reading: {:.1f} s; comparing: {:.1f} s; writing: {:.1f} s)'.format(
+        len(old_df), len(new_df), t3 - t0, t1 - t0, t2 - t1, t3 - t2))
+
+    return diff_file
+
+
+def convert_export(file, columnar_file=None, engine=None):
+    """
+    convert SURF Reporting export once to a columnar intermediate (.feather) with the derived columns of the
+    autorisation overview, which is read memory-mapped instead of parsing the export again
+    :param file: SURF Reporting export (.xlsx or .csv)
+    :param columnar_file: resulting .feather file (defaults to the export with extension .feather)
+    :param engine: engine for reading .xlsx files ("calamine" or "openpyxl"; default: calamine if installed)
+    :return: path of .feather file (None if the export could not be converted)
+    """
+    if not check_export(file):
+        return None
+    if os.path.splitext(file)[-1].lower() == '.feather':
+        # already converted; the export would be memory-mapped while it is overwritten
+        logging.error('"{}" is a columnar intermediate already.'.format(file))
+        return None
+    try:
+        import pyarrow
+        import pyarrow.feather
+    except ImportError:
+        logging.error('pyarrow is required for the columnar intermediate; install with "pip install -e .[columnar]"')
+        return None
+
+    if columnar_file is None:
+        columnar_file = os.path.splitext(file)[0] + '.feather'
+
+    t0 = time.perf_counter()
+    df = normalize_report(read_export(file, engine=engine))
+    t1 = time.perf_counter()
+
+    # keep the index, being the row numbers in the export shown in the autorisation overview
+    table = pyarrow.Table.from_pandas(df)
+    metadata = dict(table.schema.metadata or {})
+    metadata[DATE_METADATA_KEY] = export_date(file).encode()
+    # uncompressed, so the memory-mapped buffers are used as they are instead of being decompressed; written to a
+    # temporary file first, so a .feather file being read memory-mapped is never truncated
+    pyarrow.feather.write_feather(table.replace_schema_metadata(metadata), columnar_file + '.tmp',
+                                  compression='uncompressed')
+    os.replace(columnar_file + '.tmp', columnar_file)
+    t2 = time.perf_counter()
+
+    logging.info('Converted {} rows to "{}" in {:.1f} s (reading: {:.1f} s; writing: {:.1f} s)'.format(
+        len(df), columnar_file, t2 - t0, t1 - t0, t2 - t1))
+    return columnar_file
+
 
 def main():
+    # no-op if the imports are profiled already
+    profile_startup()
     logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 
     frozen = False
@@ -172,11 +874,21 @@ def main():
 
     parser = argparse.ArgumentParser(
         description='Process SURF Research Drive reporting .xlsx file to an autorisation overview')
-    parser.add_argument('-f', '--file', default=default_file, help='Filename of source .xlsx file')
+    parser.add_argument('-f', '--file', default=default_file, help='Filename of source .xlsx (or .csv or .feather) file')
     parser.add_argument('-i', '--input-dir', default=default_input_dir, help='Directory to expect the source .xlsx file in')
     parser.add_argument('-o', '--output-dir', default=None, help='Directory to put the resulting .html files in')
     parser.add_argument('-g', '--gui', action='store_true', help='Use GUI')
+    parser.add_argument('-e', '--engine', default=None, choices=['calamine', 'openpyxl'], help='Engine to read the source .xlsx file with (default: calamine if installed)')
+    parser.add_argument('--incremental', action='store_true', help='Only render projects of which the permissions changed since the previous run')
+    parser.add_argument('--previous-dir', default=None, help='Directory with the .html files of the previous run (defaults to the output directory)')
+    parser.add_argument('-d', '--compare-file', default=None, help='Older source .xlsx (or .csv) file; create a summary of the changed permissions instead of the .html files')
+    parser.add_argument('--diff-file', default=None, help='File path to the resulting .html or .xlsx summary of changed permissions')
+    parser.add_argument('-s', '--single-file', action='store_true', help='Create a single .html file with an index of the projects instead of one .html file per project')
+    parser.add_argument('--internal-domain', action='append', default=None, help='Domain of the own institution, not counted as external domain in the single .html file (may be repeated; default: most common domain)')
+    parser.add_argument('--convert', action='store_true', help='Convert the source file to a columnar .feather file, to be used as source file of subsequent runs')
+    parser.add_argument('-w', '--workers', default=1, type=int, help='Number of processes writing .html files concurrently')
     parser.add_argument('-l', '--log-file', default=default_logfile, help='File path to log file')
+    parser.add_argument('--profile-startup', action='store_true', help='Log the time spent importing dependencies when the run ends')
     args = parser.parse_args()
 
     if args.log_file is not None:
@@ -202,16 +914,30 @@ def main():
     logging.info('Starting Research Drive report with\n{}'.format(args_txt))
 
     if args.gui:
+        from qtpy.QtWidgets import QApplication
         app = QApplication(sys.argv)
 
-        window = MainWindow(input_dir=args.input_dir)
+        window = create_main_window(input_dir=args.input_dir)
         window.show()
 
         app.exec()
 
+    elif args.convert:
+        convert_export(file=args.file, engine=args.engine)
+
+    elif args.single_file:
+        create_html_report(xlsx_file=args.file, output_dir=args.output_dir, engine=args.engine,
+                           internal_domains=args.internal_domain)
+
+    elif args.compare_file is not None:
+        create_diff_file(old_file=args.compare_file, new_file=args.file, diff_file=args.diff_file, engine=args.engine)
+
     else:
-        create_html_files(xlsx_file=args.file, output_dir=args.output_dir)
+        create_html_files(xlsx_file=args.file, output_dir=args.output_dir, workers=args.workers, engine=args.engine,
+                          incremental=args.incremental, previous_dir=args.previous_dir)
 
 
 if __name__ == '__main__':
+    # support process pool in executables (pyinstaller)
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,163 @@
+import atexit
+import logging
+import sys
+import threading
+import time
+
+# profiler started by profile_startup
+_profiler = None
+
+
+class TimedLoader:
+    """
+    Wrapper of the loader of a module that reports the start and end of loading the module to an ImportProfiler.
+
+    The original loader is restored on the spec and the module before the module is executed, so the module never
+    sees the wrapper.
+    """
+
+    def __init__(self, loader, profiler, name):
+        self.loader = loader
+        self.profiler = profiler
+        self.name = name
+        self.entered = False
+
+    def create_module(self, spec):
+        self.profiler.enter(self.name)
+        self.entered = True
+        try:
+            if hasattr(self.loader, 'create_module'):
+                return self.loader.create_module(spec)
+            return None
+        except BaseException:
+            self.profiler.exit()
+            raise
+
+    def exec_module(self, module):
+        module.__spec__.loader = self.loader
+        module.__loader__ = self.loader
+        if not self.entered:
+            # e.g. importlib.reload executes the module without creating it
+            self.profiler.enter(self.name)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler.exit()
+
+
+class ImportProfiler:
+    """
+    Profiler of the imports of a run, like "python -X importtime" but enabled from the command line of a script
+    (e.g. with --profile-startup), so it also works in executables (pyinstaller).
+
+    The profiler is a finder at the front of sys.meta_path that delegates finding a module to the other finders and
+    times loading the module, including the modules it imports. As the scripts import their heavy dependencies
+    (pandas, Qt, pyarrow, ...) only when needed, this shows which dependencies a run actually pays for.
+
+    Attributes:
+        timings (list): Tuples with name, depth, self time and cumulative time in seconds of the imported modules,
+            in order of completion.
+        started (float): Time (time.perf_counter) at which the profiler was installed.
+    """
+
+    def __init__(self):
+        self.timings = []
+        self.started = None
+        # stack per thread of [name, start time, time spent in nested imports], as modules may be imported in
+        # background threads
+        self.local = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = TimedLoader(spec.loader, self, name)
+                return spec
+        return None
+
+    @property
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def enter(self, name):
+        self.stack.append([name, time.perf_counter(), 0.])
+
+    def exit(self):
+        stack = self.stack
+        name, start, nested = stack.pop()
+        elapsed = time.perf_counter() - start
+        if stack:
+            stack[-1][2] += elapsed
+        self.timings.append((name, len(stack), elapsed - nested, elapsed))
+
+    def install(self, report_at_exit=True):
+        """
+        start profiling the imports
+        :param report_at_exit: if True, log the breakdown when the interpreter exits
+        :return: self
+        """
+        self.started = time.perf_counter()
+        sys.meta_path.insert(0, self)
+        if report_at_exit:
+            atexit.register(self.report)
+        return self
+
+    def uninstall(self):
+        """
+        stop profiling the imports
+        """
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def breakdown(self):
+        """
+        summarize the timings per top level import
+        :return: list of tuples with name, cumulative time in seconds and number of modules, slowest first
+        """
+        summary = []
+        n_modules = 0
+        for name, depth, _, elapsed in self.timings:
+            n_modules += 1
+            if depth == 0:
+                summary.append((name, elapsed, n_modules))
+                n_modules = 0
+        return sorted(summary, key=lambda item: item[1], reverse=True)
+
+    def report(self, top=15):
+        """
+        log the import time breakdown
+        :param top: number of top level imports to list
+        """
+        self.uninstall()
+        breakdown = self.breakdown()
+        total = sum(elapsed for _, elapsed, _ in breakdown)
+        lines = ['Imported {} modules in {:.0f} ms ({:.0f} ms since start of profiling)'.format(
+            len(self.timings), 1000 * total, 1000 * (time.perf_counter() - self.started))]
+        for name, elapsed, n_modules in breakdown[:top]:
+            lines.append('\t{:<40s} {:8.1f} ms  ({} modules)'.format(name, 1000 * elapsed, n_modules))
+        slowest = sorted(self.timings, key=lambda item: item[2], reverse=True)[:top]
+        lines.append('Slowest modules (self time):')
+        for name, _, self_time, _ in slowest:
+            lines.append('\t{:<40s} {:8.1f} ms'.format(name, 1000 * self_time))
+        logging.info('\n'.join(lines))
+
+
+def profile_startup(argv=None, flag='--profile-startup'):
+    """
+    start profiling the imports if the flag is on the command line (once); call this in a script before importing
+    its dependencies, so they are included in the breakdown (logged when the run ends)
+    :param argv: command line arguments (defaults to sys.argv)
+    :param flag: command line flag that enables profiling
+    :return: ImportProfiler (None if the flag is not given)
+    """
+    global _profiler
+    if argv is None:
+        argv = sys.argv
+    if _profiler is None and flag in argv[1:]:
+        _profiler = ImportProfiler().install()
+    return _profiler